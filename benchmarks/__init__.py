@@ -0,0 +1,4 @@
+"""Benchmarks sem interface gráfica do banco e do `TodoApp`
+
+Uso: `python -m benchmarks --sizes 1000 10000 --output resultados.json`
+"""
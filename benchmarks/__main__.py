@@ -0,0 +1,68 @@
+import argparse
+import asyncio
+import json
+import platform
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime
+from .db_bench import run_db_benchmarks
+from .ui_bench import run_ui_benchmarks
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+DEFAULT_UI_SIZES = [1_000, 10_000]
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Mede o banco de dados e o TodoApp sem abrir janela.",
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--ui-sizes", type=int, nargs="+", default=DEFAULT_UI_SIZES)
+    parser.add_argument("--sample", type=int, default=200, help="operações por lote")
+    parser.add_argument("--skip-db", action="store_true")
+    parser.add_argument("--skip-ui", action="store_true")
+    parser.add_argument("--output", help="arquivo JSON (padrão: saída padrão)")
+    return parser.parse_args()
+
+
+async def run(args) -> dict:
+    results = []
+    if not args.skip_db:
+        results.extend(await run_db_benchmarks(args.sizes, args.sample))
+    if not args.skip_ui:
+        results.extend(await run_ui_benchmarks(args.ui_sizes, min(args.sample, 50)))
+    return {
+        "commit": current_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "results": results,
+    }
+
+
+def main():
+    args = parse_args()
+    report = json.dumps(asyncio.run(run(args)), indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(report + "\n")
+    else:
+        sys.stdout.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from database import db
+from utils import now_epoch
+
+
+@asynccontextmanager
+async def temp_database():
+    """Banco novo em um diretório temporário (o app usa `todo.db` relativo)"""
+    previous = os.getcwd()
+    directory = tempfile.mkdtemp(prefix="todo-bench-")
+    os.chdir(directory)
+    try:
+        await db.init_db()
+        yield os.path.join(directory, db.DATABASE_FILE)
+    finally:
+        await db.close_db()
+        os.chdir(previous)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+async def seed_tasks(rows: int, completed_every: int = 3, chunk: int = 50_000) -> float:
+    """Insere `rows` tarefas (uma a cada `completed_every` concluída) e retorna o tempo"""
+    now = now_epoch()
+    started = time.perf_counter()
+    for start in range(0, rows, chunk):
+        async with db.manager.transaction() as conn:
+            await conn.executemany(
+                "INSERT INTO tasks"
+                " (name, completed, rank, added_at, completed_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        f"Tarefa {i}",
+                        i % completed_every == 0,
+                        (i + 1) * db.RANK_GAP,
+                        now,
+                        now if i % completed_every == 0 else None,
+                        now,
+                    )
+                    for i in range(start, min(start + chunk, rows))
+                ],
+            )
+    return time.perf_counter() - started
+
+
+def result(suite: str, rows: int, op: str, seconds: float, count: int = 1, **extra):
+    """Uma linha do relatório JSON"""
+    return {
+        "suite": suite,
+        "rows": rows,
+        "op": op,
+        "count": count,
+        "seconds": round(seconds, 6),
+        "per_op_ms": round(seconds * 1000 / max(count, 1), 4),
+        **extra,
+    }
@@ -0,0 +1,134 @@
+import time
+from typing import Awaitable, Callable, List
+from database import db
+from utils import now_epoch
+from .common import result, seed_tasks, temp_database
+
+
+async def measure(op: Callable[[], Awaitable[object]]) -> float:
+    started = time.perf_counter()
+    await op()
+    return time.perf_counter() - started
+
+
+async def bench_size(rows: int, sample: int) -> List[dict]:
+    """Operações de `database/db.py` sobre uma tabela com `rows` tarefas"""
+    results = []
+    async with temp_database():
+        results.append(result("db", rows, "seed", await seed_tasks(rows), rows))
+        now = now_epoch()
+
+        async def insert():
+            for i in range(sample):
+                await db.add_task(f"Nova tarefa {i}", now, now)
+
+        results.append(result("db", rows, "insert", await measure(insert), sample))
+
+        async def stream_first_batch():
+            stream = db.iter_tasks(batch_size=50, list_id=db.DEFAULT_LIST_ID)
+            await anext(stream)
+            await stream.aclose()
+
+        ops = [
+            ("count", db.count_tasks),
+            ("load_all", db.get_tasks),
+            ("stream_first_batch", stream_first_batch),
+            # Como no app, a paginação é sempre dentro de uma lista
+            (
+                "load_page_first",
+                lambda: db.get_tasks_page(limit=50, list_id=db.DEFAULT_LIST_ID),
+            ),
+            (
+                "load_page_middle",
+                lambda: db.get_tasks_page(
+                    after=(rows // 2 * db.RANK_GAP, rows // 2),
+                    limit=50,
+                    completed=False,
+                    list_id=db.DEFAULT_LIST_ID,
+                ),
+            ),
+            ("search", lambda: db.search_tasks("tarefa 12", limit=200)),
+            ("status_all_complete", lambda: db.update_all_tasks_status(True, now)),
+            ("status_all_uncheck", lambda: db.update_all_tasks_status(False, now)),
+        ]
+        for name, op in ops:
+            results.append(result("db", rows, name, await measure(op)))
+
+        # Cada movimento grava uma única linha; o rebalanceamento renumera a lista
+        (first,) = await db.get_tasks_page(limit=1, list_id=db.DEFAULT_LIST_ID)
+
+        async def move():
+            # As inseridas acima vão, uma a uma, para o topo da lista
+            before = (first.rank, first.id)
+            for i in range(sample):
+                task_id = rows + i + 1
+                rank = await db.move_task(
+                    task_id, db.DEFAULT_LIST_ID, after=None, before=before
+                )
+                before = (rank, task_id)
+
+        results.append(result("db", rows, "move", await measure(move), sample))
+        results.append(
+            result(
+                "db",
+                rows,
+                "rebalance",
+                await measure(lambda: db.rebalance_ranks(db.DEFAULT_LIST_ID)),
+            )
+        )
+
+        # Lotes de `sample` ids: metade é marcada e a outra metade excluída
+        ids = [task.id for task in await db.get_tasks_page(limit=2 * sample)]
+        marked, deleted = ids[:sample], ids[sample:]
+        batches = [
+            (
+                "status_many",
+                len(marked),
+                lambda: db.update_many_task_status(marked, True, now),
+            ),
+            ("delete_many", len(deleted), lambda: db.delete_many_tasks(deleted, now)),
+            (
+                "delete_completed",
+                len(marked),
+                lambda: db.delete_completed_tasks(now),
+            ),
+            # Remoção física das excluídas acima, como no `MaintenanceJob`
+            ("purge", 2 * sample, lambda: db.purge_deleted_tasks(2 * sample)),
+        ]
+        for name, count, op in batches:
+            results.append(result("db", rows, name, await measure(op), count))
+
+        # Um lote de concluídas vai para o arquivo, como no `MaintenanceJob`
+        ids = [task.id for task in await db.get_tasks_page(limit=sample)]
+        await db.update_many_task_status(ids, True, now)
+
+        async def archive():
+            await db.archive_completed_tasks(now + 1, now, sample)
+
+        results.append(result("db", rows, "archive", await measure(archive), sample))
+
+        # Prazos: cada edição grava uma linha; o `ReminderScheduler` lê a janela
+        ids = [task.id for task in await db.get_tasks_page(limit=sample)]
+
+        async def set_due():
+            for position, task_id in enumerate(ids):
+                await db.update_task_due(task_id, now + 60 + position, now)
+
+        results.append(result("db", rows, "set_due", await measure(set_due), sample))
+        results.append(
+            result(
+                "db",
+                rows,
+                "due_window",
+                await measure(lambda: db.get_due_tasks((now, 0), now + 86400)),
+            )
+        )
+
+    return results
+
+
+async def run_db_benchmarks(sizes: List[int], sample: int = 200) -> List[dict]:
+    results = []
+    for rows in sizes:
+        results.extend(await bench_size(rows, sample))
+    return results
@@ -0,0 +1,118 @@
+import asyncio
+import itertools
+import json
+from dataclasses import asdict, dataclass
+from flet.core.control import Control
+from flet.core.protocol import CommandEncoder
+
+
+@dataclass
+class UpdateStats:
+    updates: int = 0  # chamadas de `update()` que chegariam ao cliente
+    commands: int = 0  # comandos add/set/remove gerados
+    controls: int = 0  # controles serializados (novos ou com atributos alterados)
+    bytes: int = 0  # tamanho do JSON que seria enviado
+
+    def __sub__(self, other: "UpdateStats") -> "UpdateStats":
+        return UpdateStats(
+            *(a - b for a, b in zip(asdict(self).values(), asdict(other).values()))
+        )
+
+
+class Window:
+    width = 600
+    height = 900
+    left = 0
+    top = 0
+
+
+class FakePage:
+    """Substituto de `ft.Page` sem cliente, que mede o custo de cada `update()`
+
+    Os comandos são gerados pelo mesmo diff do flet (`build_update_commands`)
+    e serializados como seriam enviados, mas ninguém os recebe: os ids dos
+    novos controles são atribuídos aqui.
+    """
+
+    def __init__(self, height: float = 900, platform: str = "linux"):
+        self.stats = UpdateStats()
+        self.controls = []
+        self.overlay = []
+        self.window = Window()
+        self.platform = platform
+        self.width = 600
+        self.height = height
+        self.title = ""
+        self.theme_mode = "DARK"
+        # A página é a raiz da árvore (`UpdateScheduler` mede a profundidade)
+        self.parent = None
+        self.floating_action_button = None
+        self.floating_action_button_location = None
+        self.on_resized = None
+        self.loop = asyncio.get_running_loop()
+        self.tasks = []
+        self._index = {"page": self}
+        self._ids = itertools.count(1)
+
+    def update(self, *controls: Control):
+        if not controls or self in controls:
+            # A própria página: o diff parte dos seus controles e do overlay
+            controls = [c for c in controls if c is not self]
+            controls += self.controls + self.overlay
+        commands, added, removed = [], [], []
+        for control in controls:
+            if control.uid is None:
+                commands.extend(
+                    control._build_add_commands(index=self._index, added_controls=added)
+                )
+            else:
+                control.build_update_commands(self._index, commands, added, removed)
+
+        for control in added:
+            if control.uid is None:
+                uid = f"_{next(self._ids)}"
+                control._Control__uid = uid
+                self._index[uid] = control
+
+        self.stats.updates += 1
+        self.stats.commands += len(commands)
+        self.stats.controls += sum(
+            len(command.commands) if command.name == "add" else 1
+            for command in commands
+        )
+        self.stats.bytes += len(json.dumps(commands, cls=CommandEncoder))
+
+        for control in removed:
+            control.will_unmount()
+            control.parent = None
+            control.page = None
+        for control in added:
+            control.did_mount()
+
+    def add(self, *controls: Control):
+        self.controls.extend(controls)
+        self.update(*controls)
+
+    def open(self, control: Control):
+        self.overlay.append(control)
+        control.open = True
+        self.update(control)
+
+    def run_task(self, handler, *args, **kwargs):
+        task = self.loop.create_task(handler(*args, **kwargs))
+        self.tasks.append(task)
+        return task
+
+    def run_thread(self, handler, *args):
+        handler(*args)
+
+    async def idle(self):
+        """Aguarda as tarefas iniciadas via `run_task` e os envios agendados"""
+        while True:
+            # Duas voltas do loop: `call_soon_threadsafe` e o envio em si
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            if not self.tasks:
+                return
+            tasks, self.tasks = self.tasks, []
+            await asyncio.gather(*tasks)
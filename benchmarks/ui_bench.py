@@ -0,0 +1,91 @@
+import time
+from dataclasses import asdict, replace
+from typing import Awaitable, Callable, List
+import flet as ft
+from classes import TodoApp
+from classes.TaskStore import ALL, ACTIVE, COMPLETED
+from .common import result, seed_tasks, temp_database
+from .fake_page import FakePage
+
+
+async def measure(page: FakePage, op: Callable[[], Awaitable[None]]) -> dict:
+    """Tempo e custo de `update()` (enviados ao cliente) de uma operação"""
+    before = replace(page.stats)
+    started = time.perf_counter()
+    await op()
+    await page.idle()
+    seconds = time.perf_counter() - started
+    return {"seconds": seconds, **asdict(page.stats - before)}
+
+
+async def confirm_last_dialog(page: FakePage):
+    """Clica em "Sim" no último `ConfirmDialog` aberto"""
+    dialog = [c for c in page.controls if isinstance(c, ft.AlertDialog)][-1]
+    await dialog.actions[1].on_click(None)
+
+
+async def bench_size(rows: int, sample: int) -> List[dict]:
+    """Fluxos do `TodoApp` com `rows` tarefas no banco"""
+    results = []
+
+    def record(op: str, measured: dict, count: int = 1):
+        seconds = measured.pop("seconds")
+        results.append(result("ui", rows, op, seconds, count, **measured))
+
+    async with temp_database():
+        await seed_tasks(rows)
+        page = FakePage()
+        app: TodoApp = None
+
+        async def startup():
+            nonlocal app
+            app = TodoApp(page)
+            # Como no `main`: `setup_page` envia a página (e o overlay) antes
+            page.update()
+            page.add(app)
+
+        record("startup", await measure(page, startup))
+
+        async def add():
+            for i in range(sample):
+                app.new_task.value = f"Nova tarefa {i}"
+                await app.add_clicked(None)
+
+        record("add", await measure(page, add), sample)
+
+        async def toggle():
+            for task in list(app.tasks_view.controls[:sample]):
+                task.display_task.value = not task.display_task.value
+                await task.status_changed(None)
+
+        record("toggle", await measure(page, toggle), sample)
+
+        for name, index in (("tab_active", ACTIVE), ("tab_completed", COMPLETED)):
+
+            async def switch():
+                app.filter.selected_index = index
+                await app.tabs_changed(None)
+
+            record(name, await measure(page, switch))
+
+        async def back_to_all():
+            app.filter.selected_index = ALL
+            await app.tabs_changed(None)
+
+        record("tab_all", await measure(page, back_to_all))
+        record("load_more", await measure(page, app.load_more_tasks))
+
+        async def complete_all():
+            await app.complete_all_tasks(None)
+            await confirm_last_dialog(page)
+
+        record("complete_all", await measure(page, complete_all))
+
+    return results
+
+
+async def run_ui_benchmarks(sizes: List[int], sample: int = 20) -> List[dict]:
+    results = []
+    for rows in sizes:
+        results.extend(await bench_size(rows, sample))
+    return results
@@ -1,6 +1,5 @@
 import flet as ft
-import asyncio
-from typing import Callable
+from typing import Awaitable, Callable, Union
 
 
 class ConfirmDialog:
@@ -9,7 +8,7 @@ class ConfirmDialog:
         page: ft.Page,
         title: str,
         message: str,
-        on_confirm: Callable[[], None],
+        on_confirm: Callable[[], Union[None, Awaitable[None]]],
         is_async: bool = False,
     ):
         self.page = page
@@ -19,13 +18,14 @@ class ConfirmDialog:
             self.dialog.open = False
             self.page.update()
 
-        def handle_confirm(event: ft.ControlEvent):
+        async def handle_confirm(event: ft.ControlEvent):
             close_dlg()
 
+            # Executado no loop do app, sem criar um novo loop por clique
             if not is_async:
                 on_confirm()
             else:
-                asyncio.run(on_confirm())
+                await on_confirm()
 
         self.dialog = ft.AlertDialog(
             modal=True,
@@ -0,0 +1,45 @@
+import flet as ft
+from typing import Awaitable, Callable
+
+
+class PromptDialog:
+    """Diálogo com um campo de texto (ex.: nome de uma nova lista)"""
+
+    def __init__(
+        self,
+        page: ft.Page,
+        title: str,
+        label: str,
+        on_submit: Callable[[str], Awaitable[None]],
+        submit_text: str = "Criar",
+    ):
+        self.page = page
+        self.on_submit = on_submit
+
+        def close_dlg(event: ft.ControlEvent = None):
+            self.dialog.open = False
+            self.page.update()
+
+        async def handle_submit(event: ft.ControlEvent):
+            value = (self.field.value or "").strip()
+            if not value:
+                return
+            close_dlg()
+            await on_submit(value)
+
+        self.field = ft.TextField(label=label, autofocus=True, on_submit=handle_submit)
+        self.dialog = ft.AlertDialog(
+            modal=True,
+            title=ft.Text(title),
+            content=self.field,
+            actions=[
+                ft.TextButton("Cancelar", on_click=close_dlg),
+                ft.TextButton(submit_text, on_click=handle_submit),
+            ],
+            actions_alignment=ft.MainAxisAlignment.END,
+        )
+
+    def open(self):
+        self.page.add(self.dialog)
+        self.dialog.open = True
+        self.page.update()
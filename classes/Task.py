@@ -1,36 +1,70 @@
-import asyncio
-from typing import Callable, Self
+from datetime import datetime, time, timedelta
+from typing import Awaitable, Callable, Optional, Self
 import flet as ft
 from classes import SnackBar
 from classes import ConfirmDialog
+from database.db import Task as TaskRecord
+from utils import epoch4ptbr, traced
+
+# Estilos imutáveis compartilhados por todas as linhas
+UNCOMPLETED_STYLE = ft.TextStyle(size=16)
+COMPLETED_STYLE = ft.TextStyle(
+    size=16,
+    decoration=ft.TextDecoration.LINE_THROUGH,
+    color=ft.Colors.GREY_600,
+)
+
+# Dica da marca das tarefas arquivadas
+ARCHIVED_TOOLTIP = "Arquivada: fora das ações em massa; desmarque para restaurar"
+
+# Hora do lembrete no dia escolhido no calendário (horário local)
+DUE_HOUR = 9
+
+
+def first_due_day(now: datetime) -> datetime:
+    """Primeiro dia cujo horário do lembrete ainda não passou"""
+    day = datetime.combine(now.date(), time(DUE_HOUR))
+    return day if day > now else day + timedelta(days=1)
 
 
 class Task(ft.Column):
+    """Linha exibida de uma tarefa
+
+    Os dados ficam no registro (`database.db.Task`), que continua existindo
+    quando a linha sai da tela; a linha apenas o exibe e altera.
+    """
+
     def __init__(
         self,
         page: ft.Page,
-        task_id: int,
-        task_name: str,
-        task_status_change: Callable[[Self], None],
-        task_delete: Callable[["Task"], None],
-        task_edit: Callable[["Task", str], None],
-        completed: bool,
-        added_at: str,
-        updated_at: str,
-        completed_at: str = "",
+        record: TaskRecord,
+        task_status_change: Callable[[Self], Awaitable[None]],
+        task_delete: Callable[["Task"], Awaitable[None]],
+        # (linha, nome novo, nome anterior)
+        task_edit: Callable[["Task", str, str], Awaitable[None]],
+        # (linha, prazo novo, prazo anterior), em época; `None` sem prazo
+        task_due_change: Optional[
+            Callable[["Task", Optional[int], Optional[int]], Awaitable[None]]
+        ] = None,
+        schedule_update: Optional[Callable[..., None]] = None,
+        # Tarefa do arquivo: exibida em "Concluídas", mas contada à parte
+        archived: bool = False,
+        # Calendário compartilhado pelas linhas (um só no overlay da página);
+        # sem ele, a linha cria o seu na primeira vez
+        due_picker: Optional[ft.DatePicker] = None,
     ):
         super().__init__()
         # page
         self.page = page
         # task itself
-        self.task_id = task_id
-        self.task_name = task_name
+        self.record = record
         self.task_status_change = task_status_change
         self.task_delete = task_delete
         self.task_edit = task_edit  # Callback para edição
-        self.completed = completed
-        self.added_at = added_at
-        self.completed_at = completed_at
+        self.task_due_change = task_due_change
+        self.due_picker = due_picker
+        # Envio das alterações (agrupado pelo `UpdateScheduler` do app)
+        self.schedule_update = schedule_update or page.update
         # column
         self.spacing = 10
         self.visible = True
@@ -39,11 +73,8 @@ class Task(ft.Column):
         self.display_task = ft.Checkbox(
             value=self.completed,
             label=self.task_name,
-            label_style=ft.TextStyle(
-                size=16,
-                decoration=ft.TextDecoration.LINE_THROUGH if self.completed else None,
-                color=ft.Colors.GREY_600 if self.completed else None,
-            ),
+            label_style=COMPLETED_STYLE if self.completed else UNCOMPLETED_STYLE,
+            tooltip=self.dates_tooltip(),
             on_change=self.status_changed,
         )
 
@@ -55,21 +86,17 @@ class Task(ft.Column):
                     scroll=True,
                     expand=True,
                 ),
-                ft.Row(
-                    controls=[
-                        ft.PopupMenuButton(
-                            items=[
-                                ft.PopupMenuItem(
-                                    icon=ft.Icons.EDIT_OUTLINED,
-                                    text="Editar Tarefa",
-                                    on_click=self.edit_clicked,
-                                ),
-                                ft.PopupMenuItem(
-                                    icon=ft.Icons.DELETE_OUTLINE,
-                                    text="Remover Tarefa",
-                                    on_click=self.delete_clicked,
-                                ),
-                            ]
+                ft.PopupMenuButton(
+                    items=[
+                        ft.PopupMenuItem(
+                            icon=ft.Icons.EDIT_OUTLINED,
+                            text="Editar Tarefa",
+                            on_click=self.edit_clicked,
+                        ),
+                        ft.PopupMenuItem(
+                            icon=ft.Icons.DELETE_OUTLINE,
+                            text="Remover Tarefa",
+                            on_click=self.delete_clicked,
                         ),
                     ]
                 ),
@@ -77,16 +104,47 @@ class Task(ft.Column):
             alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
         )
 
+        if archived:
+            self.display_view.controls[0].controls.insert(
+                0,
+                ft.Icon(
+                    ft.Icons.ARCHIVE_OUTLINED,
+                    size=18,
+                    color=ft.Colors.GREY_600,
+                    tooltip=ARCHIVED_TOOLTIP,
+                ),
+            )
+
+        # A área de edição só é criada na primeira edição (`build_edit_view`)
+        self.edit_name: ft.TextField = None
+        self.clear_due_button: ft.IconButton = None
+        self.edit_view: ft.Row = None
+
+        self.controls = [self.display_view]
+
+    def build_edit_view(self):
+        """Cria a área de edição sob demanda"""
         self.edit_name = ft.TextField(
             expand=True,
             value=self.task_name,
             on_submit=self.save_clicked,
         )
+        self.clear_due_button = ft.IconButton(
+            icon=ft.Icons.EVENT_BUSY,
+            tooltip="Remover Prazo",
+            on_click=self.clear_due_clicked,
+        )
 
         self.edit_view = ft.Row(
             visible=False,
             controls=[
                 self.edit_name,
+                ft.IconButton(
+                    icon=ft.Icons.EVENT,
+                    tooltip="Definir Prazo",
+                    on_click=self.due_clicked,
+                ),
+                self.clear_due_button,
                 ft.IconButton(
                     icon=ft.Icons.DONE,
                     tooltip="Salvar Edição",
@@ -97,59 +155,164 @@ class Task(ft.Column):
             alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
         )
 
-        self.controls = [self.display_view, self.edit_view]
+        self.controls.append(self.edit_view)
+
+    @property
+    def task_id(self) -> int:
+        return self.record.id
+
+    @property
+    def task_name(self) -> str:
+        return self.record.name
+
+    @task_name.setter
+    def task_name(self, value: str):
+        self.record.name = value
+
+    @property
+    def completed(self) -> bool:
+        return self.record.completed
 
+    @completed.setter
+    def completed(self, value: bool):
+        self.record.completed = value
+
+    @property
+    def due_at(self) -> Optional[int]:
+        return self.record.due_at
+
+    @due_at.setter
+    def due_at(self, value: Optional[int]):
+        self.record.due_at = value
+
+    def dates_tooltip(self) -> str:
+        """Datas da tarefa em pt_BR (formatação com cache, sem reconverter texto)"""
+        lines = [f"Adicionada em {epoch4ptbr(self.record.added_at)}"]
+        if self.due_at:
+            lines.append(f"Prazo: {epoch4ptbr(self.due_at)}")
+        if self.completed and self.record.completed_at:
+            lines.append(f"Concluída em {epoch4ptbr(self.record.completed_at)}")
+        return "\n".join(lines)
+
+    def is_isolated(self) -> bool:
+        # A linha se atualiza sozinha; assim o diff do `ListView` não percorre
+        # os controles internos de todas as tarefas
+        return True
+
+    @traced
     def edit_clicked(self, event: ft.ControlEvent):
         """Ativa o modo de edição da tarefa"""
         if self.completed:
             SnackBar(self.page, f"Tarefas concluídas não podem ser editadas.")
             return
 
+        if self.edit_view is None:
+            self.build_edit_view()
+
         self.edit_name.value = self.task_name
+        self.clear_due_button.visible = self.due_at is not None
         self.edit_view.visible = True
         self.display_view.visible = False
-        self.edit_name.focus()
+        # O campo precisa estar montado (criado sob demanda) antes do foco
         self.update()
+        self.edit_name.focus()
 
-    def save_clicked(self, event: ft.ControlEvent):
+    @traced
+    async def save_clicked(self, event: ft.ControlEvent):
         """Salva as alterações da tarefa"""
         new_name = self.edit_name.value.strip()
         if new_name and new_name != self.task_name:
+            old_name = self.task_name
             self.task_name = new_name
             self.display_task.label = new_name
-            asyncio.run(self.task_edit(self, new_name))
+            await self.task_edit(self, new_name, old_name)
 
-        self.update_task_appearance()
+        self.update_task_appearance(update=False)
         self.display_view.visible = True
         self.edit_view.visible = False
-        self.update()
+        self.schedule_update(self)
 
+    @traced
+    def due_clicked(self, event: ft.ControlEvent):
+        """Abre o calendário para escolher o prazo"""
+        first = first_due_day(datetime.now())
+        current = datetime.fromtimestamp(self.due_at) if self.due_at else first
+        if self.due_picker is None:
+            self.due_picker = ft.DatePicker(help_text="Prazo da tarefa")
+        # O mesmo calendário é reaberto (`page.open` não o duplica no overlay)
+        picker = self.due_picker
+        picker.value, picker.first_date = current, min(current, first)
+        picker.on_change = self.due_picked
+        self.page.open(picker)
+
+    @traced
+    async def due_picked(self, event: ft.ControlEvent):
+        """Define o prazo no dia escolhido, às `DUE_HOUR` horas"""
+        picked = event.control.value
+        if picked is None:
+            return
+        due = datetime.combine(picked.date(), time(DUE_HOUR))
+        if due <= datetime.now():
+            SnackBar(
+                self.page,
+                f"O prazo precisa ser futuro: {DUE_HOUR}h de "
+                f"{due:%d/%m/%Y} já passou.",
+            )
+            return
+        await self.change_due(int(due.timestamp()))
+
+    @traced
+    async def clear_due_clicked(self, event: ft.ControlEvent):
+        """Remove o prazo (e o lembrete)"""
+        await self.change_due(None)
+
+    async def change_due(self, due_at: Optional[int]):
+        if due_at == self.due_at:
+            return
+        old_due = self.due_at
+        self.due_at = due_at
+        self.clear_due_button.visible = due_at is not None
+        self.update_task_appearance(update=False)
+        self.schedule_update(self)
+        if self.task_due_change is not None:
+            await self.task_due_change(self, due_at, old_due)
+
+    @traced
     def delete_clicked(self, event: ft.ControlEvent):
         """Solicita confirmação para excluir a tarefa"""
 
-        def confirm_delete():
-            asyncio.run(self.task_delete(self))
+        @traced
+        async def confirm_delete():
+            await self.task_delete(self)
 
         confirm = ConfirmDialog(
             self.page,
             "Confirmar exclusão",
             f'Tem certeza que deseja remover a tarefa "{self.task_name}"?',
             confirm_delete,
+            True,
         )
         confirm.open()
 
-    def status_changed(self, event: ft.ControlEvent):
+    @traced
+    async def status_changed(self, event: ft.ControlEvent):
         """Atualiza o status de conclusão da tarefa"""
         self.completed = self.display_task.value
         self.update_task_appearance()
-        asyncio.run(self.task_status_change(self))
-
-    def update_task_appearance(self):
-        """Atualiza a aparência visual com base no estado"""
-        self.display_task.label_style = ft.TextStyle(
-            size=16,
-            decoration=ft.TextDecoration.LINE_THROUGH if self.completed else None,
-            color=ft.Colors.GREY_600 if self.completed else None,
+        await self.task_status_change(self)
+
+    def update_task_appearance(self, update: bool = True):
+        """Atualiza a aparência visual com base no estado (também após uma
+        alteração desfeita)
+
+        Com `update=False` apenas altera as propriedades, deixando o envio
+        para quem chamou (útil em operações em massa).
+        """
+        self.display_task.label_style = (
+            COMPLETED_STYLE if self.completed else UNCOMPLETED_STYLE
         )
         self.display_task.value = self.completed
-        self.display_task.update()
+        self.display_task.label = self.task_name
+        self.display_task.tooltip = self.dates_tooltip()
+        if update:
+            self.schedule_update(self.display_task)
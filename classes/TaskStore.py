@@ -0,0 +1,250 @@
+from bisect import bisect_left
+from operator import attrgetter
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from database.db import Task
+
+# Abas do `TodoApp`: "Todas", "Ativas" e "Concluídas"
+ALL, ACTIVE, COMPLETED = 0, 1, 2
+
+# Ordem das abas: a ordem manual da lista, desempatada pelo id
+task_key = attrgetter("rank", "id")
+
+# (aba, posição, registro inserido ou `None` se removido), para replicar no `ListView`
+Changes = List[Tuple[int, int, Optional[Task]]]
+
+
+class TaskStore:
+    """Registros das tarefas carregadas, indexados por id e por aba.
+
+    Guarda apenas os registros compactos (`database.db.Task`), nunca os
+    controles. Cada aba mantém seus membros ordenados por `(rank, id)`, e os
+    contadores refletem o banco inteiro (inclusive as tarefas ainda não
+    carregadas), de modo que rodapé, menus e filtros custam O(1) ou
+    O(alteradas) por evento.
+
+    As tarefas arquivadas carregadas ficam à parte (`archived`), fora dos
+    contadores, e são exibidas em "Concluídas" depois das recentes; o total
+    delas no banco fica em `archived_total`.
+
+    Os resultados da busca que ainda não foram carregados também ficam à
+    parte (`found`): contam nos totais, mas não entram nas abas, que seguem
+    contíguas a partir do início da lista (e a ordem manual, entre vizinhos
+    reais no banco).
+    """
+
+    def __init__(self):
+        self.tasks: Dict[int, Task] = {}
+        self.views: Dict[int, List[Task]] = {ALL: [], ACTIVE: [], COMPLETED: []}
+        self.archived: List[Task] = []
+        self.archived_ids: Set[int] = set()
+        self.found: Dict[int, Task] = {}
+        self.total = 0
+        self.completed = 0
+        self.archived_total = 0
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def __contains__(self, task_id: int) -> bool:
+        return task_id in self.tasks
+
+    def __iter__(self) -> Iterator[Task]:
+        return iter(self.views[ALL])
+
+    def get(self, task_id: int) -> Optional[Task]:
+        task = self.tasks.get(task_id)
+        return self.found.get(task_id) if task is None else task
+
+    @property
+    def active(self) -> int:
+        return self.total - self.completed
+
+    @property
+    def has_completed(self) -> bool:
+        return self.completed > 0
+
+    @property
+    def all_completed(self) -> bool:
+        return self.completed == self.total
+
+    def set_counts(self, total: int, completed: int, archived_total: int = 0):
+        """Define os totais do banco (lidos via `count_tasks`)"""
+        self.total, self.completed = total, completed
+        self.archived_total = archived_total
+
+    @staticmethod
+    def tabs_of(task: Task) -> Tuple[int, ...]:
+        """Abas em que a tarefa aparece"""
+        return (ALL, COMPLETED) if task.completed else (ALL, ACTIVE)
+
+    def load(self, task: Task) -> Changes:
+        """Indexa uma tarefa vinda do banco (já contada nos totais)"""
+        if task.id in self.tasks:
+            return []
+        # Se já estava nos resultados da busca, vale o registro em memória
+        # (pode ter alterações ainda na fila)
+        task = self.found.pop(task.id, task)
+        self.tasks[task.id] = task
+        return self._insert(task, self.tabs_of(task))
+
+    def add(self, task: Task, found: bool = False) -> Changes:
+        """Indexa uma tarefa recém-criada (ou devolve uma excluída; `found`
+        se ela estava só nos resultados da busca)"""
+        self.total += 1
+        self.completed += task.completed
+        if found:
+            self.found[task.id] = task
+            return []
+        return self.load(task)
+
+    def is_found(self, task: Task) -> bool:
+        return task.id in self.found
+
+    def set_found(self, tasks: List[Task]) -> List[Task]:
+        """Registra os resultados de uma busca e devolve os registros a exibir:
+        o carregado, se houver, senão o do resultado anterior ou o do banco"""
+        found, self.found = self.found, {}
+        results = []
+        for task in tasks:
+            loaded = self.tasks.get(task.id)
+            if loaded is None:
+                loaded = self.found[task.id] = found.get(task.id, task)
+            results.append(loaded)
+        return results
+
+    def remove(self, task: Task) -> Changes:
+        """Remove uma tarefa excluída"""
+        if self.found.pop(task.id, None) is not None:
+            self.total -= 1
+            self.completed -= task.completed
+            return []
+        if self.tasks.pop(task.id, None) is None:
+            return []
+        self.total -= 1
+        self.completed -= task.completed
+        return self._remove(task, self.tabs_of(task))
+
+    def status_changed(self, task: Task) -> Changes:
+        """Move a tarefa entre "Ativas" e "Concluídas" após a troca de status"""
+        if task.id in self.found:
+            self.completed += 1 if task.completed else -1
+            return []
+        if task.completed:
+            self.completed += 1
+            return self._remove(task, (ACTIVE,)) + self._insert(task, (COMPLETED,))
+        self.completed -= 1
+        return self._remove(task, (COMPLETED,)) + self._insert(task, (ACTIVE,))
+
+    def move(self, task: Task, rank: int) -> Changes:
+        """Reposiciona a tarefa em todas as suas abas após a troca de rank"""
+        tabs = self.tabs_of(task)
+        changes = self._remove(task, tabs)
+        task.rank = rank
+        return changes + self._insert(task, tabs)
+
+    def persisted(self, task: Task, task_id: int, rank: int) -> Changes:
+        """Troca o id e o rank provisórios pelos gravados no banco
+
+        A tarefa é reposicionada nas abas em que está (o status pode ter
+        mudado enquanto era gravada); no caso comum, no fim da lista, a
+        posição não muda e não há nada a replicar.
+        """
+        changes = []
+        duplicate = self.tasks.pop(task_id, None)
+        if duplicate is not None:
+            # Lida por uma página durante a gravação: fica só a já exibida
+            changes = self._remove(duplicate, self.tabs_of(duplicate))
+        removed = self._remove(task, (ALL, ACTIVE, COMPLETED))
+        del self.tasks[task.id]
+        task.id, task.rank = task_id, rank
+        self.tasks[task_id] = task
+        inserted = self._insert(task, tuple(tab for tab, _, _ in removed))
+        if [change[:2] for change in removed] == [change[:2] for change in inserted]:
+            return changes
+        return changes + removed + inserted
+
+    def set_ranks(self, ranks: Dict[int, int]):
+        """Aplica ranks renumerados que mantêm a ordem (as abas seguem ordenadas)"""
+        for task_id, rank in ranks.items():
+            task = self.get(task_id)
+            if task is not None:
+                task.rank = rank
+
+    def is_archived(self, task: Task) -> bool:
+        return task.id in self.archived_ids
+
+    def load_archived(self, task: Task) -> Changes:
+        """Exibe em "Concluídas", após as recentes, uma tarefa arquivada"""
+        if task.id in self.archived_ids or task.id in self.tasks:
+            return []
+        self.archived_ids.add(task.id)
+        position = bisect_left(self.archived, task_key(task), key=task_key)
+        self.archived.insert(position, task)
+        return [(COMPLETED, len(self.views[COMPLETED]) + position, task)]
+
+    def remove_archived(self, task: Task) -> Changes:
+        """Retira uma tarefa arquivada (excluída ou restaurada)"""
+        if task.id not in self.archived_ids:
+            return []
+        self.archived_ids.discard(task.id)
+        position = bisect_left(self.archived, task_key(task), key=task_key)
+        del self.archived[position]
+        return [(COMPLETED, len(self.views[COMPLETED]) + position, None)]
+
+    def restore(self, task: Task) -> Changes:
+        """Devolve uma tarefa arquivada às abas, já desmarcada"""
+        changes = self.remove_archived(task)
+        task.completed = False
+        return changes + self.add(task)
+
+    def complete_all(self) -> List[Task]:
+        """Conclui todas as tarefas e devolve as que foram alteradas"""
+        found = [task for task in self.found.values() if not task.completed]
+        changed = self.views[ACTIVE] + found
+        for task in changed:
+            task.completed = True
+        self.views[ACTIVE], self.views[COMPLETED] = [], list(self.views[ALL])
+        self.completed = self.total
+        return changed
+
+    def uncheck_all(self) -> List[Task]:
+        """Desmarca todas as tarefas e devolve as que foram alteradas"""
+        found = [task for task in self.found.values() if task.completed]
+        changed = self.views[COMPLETED] + found
+        for task in changed:
+            task.completed = False
+        self.views[ACTIVE], self.views[COMPLETED] = list(self.views[ALL]), []
+        self.completed = 0
+        return changed
+
+    def remove_completed(self) -> List[Task]:
+        """Remove todas as tarefas concluídas e devolve as removidas"""
+        found = [task for task in self.found.values() if task.completed]
+        removed = self.views[COMPLETED] + found
+        for task in removed:
+            if self.found.pop(task.id, None) is None:
+                del self.tasks[task.id]
+        self.views[ALL] = list(self.views[ACTIVE])
+        self.views[COMPLETED] = []
+        self.total -= self.completed
+        self.completed = 0
+        return removed
+
+    def _insert(self, task: Task, tabs: Tuple[int, ...]) -> Changes:
+        changes = []
+        for tab in tabs:
+            view = self.views[tab]
+            position = bisect_left(view, task_key(task), key=task_key)
+            view.insert(position, task)
+            changes.append((tab, position, task))
+        return changes
+
+    def _remove(self, task: Task, tabs: Tuple[int, ...]) -> Changes:
+        changes = []
+        for tab in tabs:
+            view = self.views[tab]
+            position = bisect_left(view, task_key(task), key=task_key)
+            if position < len(view) and view[position] is task:
+                del view[position]
+                changes.append((tab, position, None))
+        return changes
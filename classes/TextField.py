@@ -1,4 +1,5 @@
 import flet as ft
+import asyncio
 from typing import Callable, Optional
 
 
@@ -18,6 +19,7 @@ class TextField(ft.TextField):
         focused_border_color: ft.colors,
         text_vertical_align: float | int,
         suffix: Optional[ft.Control] = None,
+        on_change: Optional[Callable[[ft.ControlEvent], None]] = None,
     ):
         super().__init__()
         self.hint_text = hint_text
@@ -30,6 +32,7 @@ class TextField(ft.TextField):
         self.border_color = border_color
         self.focused_border_color = focused_border_color
         self.text_vertical_align = text_vertical_align
+        self.on_change = on_change
 
         if suffix is None:
             self.suffix = ft.IconButton(
@@ -46,3 +49,11 @@ class TextField(ft.TextField):
         """Método interno para limpar o texto do campo."""
         self.value = ""
         self.update()
+
+        # Limpar pelo botão também conta como alteração do texto
+        if self.on_change is None:
+            return
+        if asyncio.iscoroutinefunction(self.on_change):
+            self.page.run_task(self.on_change, event)
+        else:
+            self.on_change(event)
@@ -1,20 +1,68 @@
 import flet as ft
 import asyncio
+from itertools import count
+from bisect import bisect_left, bisect_right
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from flet import FloatingActionButtonLocation
-from utils import get_current_datetime
+from utils import epoch4ptbr, now_epoch, startup_timer, trace_attribute, traced
 from classes import Task
+from classes import TaskStore
+from classes.TaskStore import ALL, ACTIVE, COMPLETED, Changes, task_key
 from classes import ConfirmDialog
+from classes import PromptDialog
 from classes import SnackBar
 from classes import TextField
+from classes import UpdateScheduler
 from database import (
     add_task,
-    get_tasks,
-    update_task_status,
+    add_list,
+    get_lists,
+    iter_tasks,
+    search_tasks,
+    move_task,
+    rebalance_ranks,
+    get_ranks,
+    update_all_tasks_status,
     delete_task,
-    update_task_name,
-    delete_many_tasks,
-    update_current_theme,
+    delete_completed_tasks,
+    get_archived_page,
+    restore_archived_task,
+    delete_archived_task,
+    maintenance,
+    reminders,
+    settings,
+    update_task_due,
+    write_queue,
 )
+from database.db import DEFAULT_LIST_ID, FIRST_KEY, TaskKey, TaskList
+from database.db import Task as TaskRecord
+from database.write_behind import PendingName, PendingStatus
+
+# Tarefas buscadas por vez no banco e distância (px) do fim da lista que
+# dispara a próxima busca
+PAGE_SIZE = 50
+LOAD_THRESHOLD = 300
+
+# Cada página chega em lotes, exibidos assim que lidos (o primeiro cobre a tela)
+STREAM_BATCH = 20
+
+# Pausa na digitação (s) antes de consultar a busca e máximo de resultados
+SEARCH_DEBOUNCE = 0.25
+SEARCH_LIMIT = 200
+
+# Filtro de `completed` usado na paginação de cada aba
+TAB_FILTERS = {ALL: None, ACTIVE: False, COMPLETED: True}
+
+# Espera máxima (s) pelo tamanho da janela antes de exibir a lista assim mesmo
+PAGE_SIZED_TIMEOUT = 1.0
+
+# Intervalo mínimo entre ranks vizinhos após mover uma tarefa; abaixo dele a
+# lista é rebalanceada em segundo plano, antes que os ranks livres acabem
+REBALANCE_GAP = 16
+
+# Rank das tarefas recém-adicionadas enquanto são gravadas (id provisório,
+# negativo): depois de todas as já gravadas, na ordem em que foram criadas
+PROVISIONAL_RANK = 1 << 62
 
 
 class TodoApp(ft.Column):
@@ -22,7 +70,40 @@ class TodoApp(ft.Column):
         super().__init__()
         self.page = page
         self.expand = True
-        self.all_tasks = []
+        # Cada evento envia suas alterações em um único `page.update()`
+        self.scheduler = UpdateScheduler(page)
+        # Lista exibida (só as tarefas dela são carregadas) e totais de cada lista
+        self.list_id: int = settings.get("list", DEFAULT_LIST_ID)
+        self.task_lists: Dict[int, TaskList] = {}
+        # Registros já carregados (janela), indexados por id e por aba
+        self.store = TaskStore()
+        # Linhas (controles) só das tarefas exibidas no `ListView`, por id
+        self.rows: Dict[int, Task] = {}
+        # Chave `(rank, id)` da última tarefa buscada e fim da lista, por aba
+        self.cursors: Dict[int, TaskKey] = {index: FIRST_KEY for index in TAB_FILTERS}
+        self.exhausted = {index: False for index in TAB_FILTERS}
+        # Arquivo exibido em "Concluídas" após as recentes, sob demanda
+        self.archive_cursor: TaskKey = FIRST_KEY
+        self.archive_exhausted = False
+        self.loading = False
+        # Pedido de página feito durante outra carga, atendido quando ela termina
+        self.load_requested = False
+        # Movimentos e rebalanceamentos da ordem manual, um de cada vez
+        self.rank_lock = asyncio.Lock()
+        # Adições exibidas na hora e gravadas em segundo plano, por id provisório
+        self.provisional_ids = count(-1, -1)
+        self.pending_adds: Dict[int, asyncio.Future] = {}
+        # Aviso reaproveitado (`notify`), montado com a página
+        self.notice = ft.SnackBar(ft.Text(""), show_close_icon=True, duration=2000)
+        page.overlay.append(self.notice)
+        # Calendário dos prazos, reaproveitado por todas as linhas
+        self.due_picker = ft.DatePicker(help_text="Prazo da tarefa")
+        # Resultados exibidos no lugar da aba enquanto houver texto na busca
+        self.search_results: Optional[List[TaskRecord]] = None
+        self.search_generation = 0
+        # Sinalizado quando o app está montado e a altura da janela é conhecida
+        self.mounted = False
+        self.page_sized = asyncio.Event()
 
         self.page.floating_action_button = ft.FloatingActionButton(
             icon=ft.Icons.DONE_ALL,
@@ -49,10 +130,26 @@ class TodoApp(ft.Column):
             text_vertical_align=0.5,
         )
 
-        self.tasks_view = ft.ListView(
-            spacing=10,
-            auto_scroll=True,
+        self.search = TextField(
+            hint_text="Buscar tarefas...",
+            expand=True,
+            on_submit=self.search_changed,
+            on_change=self.search_changed,
+            prefix_icon=ft.Icons.SEARCH,
+            text_size=14,
+            height=40,
+            border_radius=8,
+            border_color=ft.Colors.GREY_800,
+            focused_border_color=ft.Colors.BLUE_400,
+            text_vertical_align=0.5,
+        )
+
+        # Arrastar e soltar define a ordem manual das tarefas
+        self.tasks_view = ft.ReorderableListView(
             height=400,
+            on_scroll=self.tasks_scrolled,
+            on_scroll_interval=100,
+            on_reorder=self.task_reordered,
         )
 
         self.filter = ft.Tabs(
@@ -68,6 +165,23 @@ class TodoApp(ft.Column):
 
         self.items_left = ft.Text("Nenhuma tarefa.")
 
+        self.list_picker = ft.Dropdown(
+            value=str(self.list_id),
+            options=[],
+            on_change=self.list_changed,
+            expand=True,
+            dense=True,
+            border_radius=8,
+            border_color=ft.Colors.GREY_800,
+            focused_border_color=ft.Colors.BLUE_400,
+        )
+
+        self.add_list_button = ft.IconButton(
+            icon=ft.Icons.PLAYLIST_ADD,
+            on_click=self.add_list_clicked,
+            tooltip="Nova lista",
+        )
+
         self.toggle_theme_button = ft.IconButton(
             icon=ft.Icons.LIGHT_MODE,
             on_click=self.toggle_theme,
@@ -78,14 +192,14 @@ class TodoApp(ft.Column):
             icon=ft.Icons.REMOVE_DONE,
             text="Remover Concluídas",
             on_click=self.clear_clicked,
-            disabled=not any(task.completed for task in self.all_tasks),
+            disabled=True,
         )
 
         self.uncheck_completed_tasks = ft.PopupMenuItem(
             icon=ft.Icons.UNPUBLISHED_OUTLINED,
             text="Desmarcar Concluídas",
             on_click=self.uncheck_clicked,
-            disabled=not any(task.completed for task in self.all_tasks),
+            disabled=True,
         )
 
         content = ft.Column(
@@ -99,6 +213,8 @@ class TodoApp(ft.Column):
                         self.toggle_theme_button,
                     ],
                 ),
+                # Lista exibida e botão de criar lista
+                ft.Row(controls=[self.list_picker, self.add_list_button]),
                 # Campo de texto e botão de adicionar tarefa
                 ft.Row(
                     controls=[
@@ -116,6 +232,7 @@ class TodoApp(ft.Column):
                 ft.Container(
                     content=ft.Column(
                         [
+                            ft.Row(controls=[self.search]),
                             self.filter,
                             ft.Container(
                                 content=self.tasks_view,
@@ -146,54 +263,52 @@ class TodoApp(ft.Column):
             )
         )
 
+        # Com `TODO_TRACE`, mede também cada envio de alterações ao cliente
+        trace_attribute(self.page, "update", "page.update")
         self.page.on_resized = self.on_resize
         self.page.run_task(self.initialize_async)
 
+    @traced
     async def complete_all_tasks(self, event: ft.ControlEvent):
         """Marca todas as tarefas visíveis como concluídas"""
 
         # Verifica se está nas abas permitidas (Todas ou Ativas)
-        if self.filter.selected_index not in [0, 1]:
+        if self.filter.selected_index not in [ALL, ACTIVE]:
             SnackBar(self.page, "Ação disponível apenas nas abas Todas ou Ativas.")
             return
 
-        if all(task.completed for task in self.all_tasks):
+        if self.store.all_completed:
             SnackBar(self.page, "Todas as tarefas já estão concluídas.")
             return
 
         # Confirmação antes de executar
+        @traced
         async def confirm_complete():
-            tasks_to_complete = []
+            # Grava antes as alterações pendentes para não sobrescrever o lote
+            await self.settle()
 
-            if self.filter.selected_index == 0:  # Tab "Todas"
-                tasks_to_complete = [
-                    task for task in self.all_tasks if not task.completed
-                ]
-            elif self.filter.selected_index == 1:  # Tab "Ativas"
-                tasks_to_complete = [
-                    task for task in self.all_tasks if not task.completed
-                ]
+            # Um único UPDATE/commit no banco (inclusive para as tarefas ainda
+            # não carregadas), com uma única leitura do relógio
+            changed = await update_all_tasks_status(
+                completed=True, updated_at=now_epoch(), list_id=self.list_id
+            )
 
-            for task in tasks_to_complete:
-                task.completed = True
-                task.display_task.value = True
-                task.update_task_appearance()
-                if task.task_id:
-                    await update_task_status(
-                        task_id=task.task_id,
-                        completed=True,
-                        updated_at=get_current_datetime(),
-                        completed_at=get_current_datetime(),
-                    )
+            changed_tasks = self.store.complete_all()
+            self.refresh_rows(changed_tasks)
 
-            self.update_tasks_view()
-            self.completed_tasks(self.all_tasks)
+            # Não restam ativas; as novas concluídas ainda não carregadas
+            # voltam a ser buscadas a partir do cursor de "Ativas"
+            self.cursors[COMPLETED] = min(self.cursors[ACTIVE], self.cursors[COMPLETED])
+            self.exhausted[COMPLETED] = (
+                self.exhausted[ACTIVE] and self.exhausted[COMPLETED]
+            )
+            self.exhausted[ACTIVE] = True
+
+            self.update_tasks_view(changed_tasks)
+            self.completed_tasks()
             self.clear_completed_tasks_buttom_enable()
-            self.page.update()
 
-            SnackBar(
-                self.page, f"{len(tasks_to_complete)} tarefas marcadas como concluídas!"
-            )
+            SnackBar(self.page, f"{changed} tarefas marcadas como concluídas!")
 
         ConfirmDialog(
             self.page,
@@ -203,71 +318,480 @@ class TodoApp(ft.Column):
             True,
         ).open()
 
+    @traced
     async def initialize_async(self):
-        await self.initial_resize()
-        await self.load_tasks_from_db()
+        """Carrega os dados iniciais enquanto a interface é montada
+
+        Totais e primeiro lote são lidos em paralelo, e a lista é exibida
+        assim que o app estiver montado com a altura da janela conhecida; o
+        restante da primeira página chega em seguida.
+        """
+        loop = asyncio.get_running_loop()
+        write_queue.start(loop)
+        settings.start(loop)
+        maintenance.start(loop)
+        maintenance.on_archived = self.tasks_archived
+        write_queue.on_error = self.writes_failed
+        reminders.on_due = self.task_due
+        reminders.start(loop)
+        # Excluídas de sessões anteriores são removidas assim que o app ficar ocioso
+        maintenance.schedule()
+        self.loading = True
+        try:
+            await self.show_first_page()
+        finally:
+            await self.loading_done()
 
-    async def initial_resize(self):
-        await asyncio.sleep(0.5)
+    async def show_first_page(self):
+        lists = asyncio.ensure_future(get_lists())
+        stream = self.page_stream(ALL)
+        first_batch = await anext(stream, [])
+        self.set_lists(await lists)
+        if self.list_id not in self.task_lists:
+            # Lista salva nas preferências não existe mais: abre a primeira
+            self.list_id = next(iter(self.task_lists))
+            self.list_picker.value = str(self.list_id)
+            stream = self.page_stream(ALL)
+            first_batch = await anext(stream, [])
+        current = self.task_lists[self.list_id]
+        startup_timer.mark("tasks_loaded")
+
+        try:
+            await asyncio.wait_for(self.page_sized.wait(), PAGE_SIZED_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass  # Sem `on_resized`: usa a altura padrão do `ListView`
+        startup_timer.mark("page_sized")
+
+        self.store.set_counts(current.total, current.completed, current.archived)
+        self.apply_page(ALL, first_batch)
         self.on_resize(None)
-        self.update()
+        self.completed_tasks()
+        self.clear_completed_tasks_buttom_enable()
+        startup_timer.mark("first_render")
+        startup_timer.report()
 
-    async def task_edit(self, task: Task, new_name: str):
-        if task.task_id:
-            await update_task_name(task.task_id, new_name, get_current_datetime())
+        await self.stream_page(ALL, stream, len(first_batch))
 
-        self.update_tasks_view()
+    def did_mount(self):
+        self.mounted = True
+        self.signal_page_sized()
+
+    def page_height(self) -> Optional[float]:
+        """Altura da janela, ou `None` se o cliente ainda não a informou"""
+        if self.page.platform == "windows":
+            return self.page.window.height or None
+        return self.page.height or None
+
+    def signal_page_sized(self):
+        """Libera a primeira exibição da lista (pode vir de outra thread)"""
+        if self.mounted and self.page_height() is not None:
+            self.page.loop.call_soon_threadsafe(self.page_sized.set)
+
+    @traced
+    async def task_edit(self, task: Task, new_name: str, old_name: str):
+        record = task.record
+        if not await self.saved(record):
+            return
+        record.updated_at = now_epoch()
+        write_queue.rename(record.id, new_name, record.updated_at, old_name)
+
+        # O nome não altera a ordem nem as abas: a própria linha já foi atualizada
         SnackBar(self.page, f"Tarefa atualizada para '{new_name}'.")
 
+    @traced
+    async def task_due_changed(
+        self, task: Task, due_at: Optional[int], old_due: Optional[int]
+    ):
+        """Grava o prazo (a linha já o exibe) e reagenda o lembrete; se a
+        gravação falhar, o prazo anterior volta"""
+        record = task.record
+        if not await self.saved(record):
+            return
+        record.updated_at = now_epoch()
+        try:
+            await update_task_due(record.id, due_at, record.updated_at)
+        except Exception:
+            if record.due_at == due_at:
+                record.due_at = old_due
+                task.update_task_appearance()
+            SnackBar(self.page, f"Não foi possível definir o prazo de '{record.name}'.")
+            return
+
+        scheduled = reminders.set(
+            record.id, None if record.completed else record.due_at
+        )
+        if due_at is None:
+            SnackBar(self.page, f"Prazo de '{record.name}' removido.")
+        elif scheduled or record.completed:
+            SnackBar(self.page, f"Prazo de '{record.name}': {epoch4ptbr(due_at)}.")
+        else:
+            # Passou enquanto era gravado: fica registrado, sem lembrete
+            SnackBar(
+                self.page,
+                f"O prazo de '{record.name}' ({epoch4ptbr(due_at)}) já passou;"
+                " nenhum lembrete foi agendado.",
+            )
+
+    @traced
+    async def task_due(self, record: TaskRecord):
+        """Lembrete do `reminders`: o prazo de uma tarefa pendente chegou"""
+        SnackBar(
+            self.page, f"Lembrete: o prazo de '{record.name}' chegou!", duration=10000
+        )
+
+    @traced
     def on_resize(self, event: ft.ControlEvent):
         """Calcula o tamanho do listview de acordo com o tamanho da tela"""
-        base_value = 280
-        if self.page.platform == "windows":
-            available_height = self.page.window.height - base_value
-            # available_width = self.page.window.width
-        else:
-            available_height = self.page.height - base_value
-            # available_width = self.page.width
+        base_value = 400
+        height = self.page_height()
+        if height is None:
+            return
+        self.signal_page_sized()
 
-        tasks_view_height = available_height
+        tasks_view_height = height - base_value
         self.tasks_view.height = tasks_view_height
-        self.update()
-
-    async def load_tasks_from_db(self):
-        """Recupera todas as tarefas do banco de dados"""
-        db_tasks = await get_tasks()
-        for task in db_tasks:
-            self.all_tasks.append(
-                Task(
-                    page=self.page,
-                    task_id=task.id,
-                    task_name=task.name,
-                    task_status_change=self.status_changed,
-                    task_delete=self.task_delete,
-                    task_edit=self.task_edit,
-                    completed=task.completed,
-                    added_at=task.added_at,
-                    updated_at=task.updated_at,
-                )
-            )
-        self.update_tasks_view()
-        self.completed_tasks(self.all_tasks)
-        self.clear_completed_tasks_buttom_enable()
-        await self.initial_resize()
+        self.scheduler.mark(self.tasks_view)
+
+    @traced
+    async def load_more_tasks(self):
+        """Busca a próxima página da aba atual e materializa só essas linhas
+
+        Em "Concluídas", esgotadas as recentes, segue pelo arquivo.
+        """
+        index = self.filter.selected_index
+        archive = index == COMPLETED and not self.archive_exhausted
+        if self.loading:
+            # Ex.: aba trocada com a primeira página ainda chegando
+            self.load_requested = True
+            return
+        if self.exhausted[index] and not archive:
+            return
+
+        self.loading = True
+        try:
+            if not self.exhausted[index]:
+                await self.stream_page(index, self.page_stream(index))
+            if archive and self.exhausted[index]:
+                await self.load_archived_page()
+        finally:
+            await self.loading_done()
+
+    async def loading_done(self):
+        """Encerra a carga em andamento e atende o pedido feito durante ela
+        (para a aba exibida agora, que pode ter ficado curta demais para rolar)"""
+        self.loading = False
+        if self.load_requested:
+            self.load_requested = False
+            if self.search_results is None:
+                await self.load_more_tasks()
+
+    async def load_archived_page(self):
+        """Acrescenta ao fim de "Concluídas" a próxima página do arquivo"""
+        store = self.store
+        db_tasks = await get_archived_page(
+            after=self.archive_cursor, limit=PAGE_SIZE, list_id=self.list_id
+        )
+        if store is not self.store:
+            return  # A lista foi trocada durante a leitura
+        for record in db_tasks:
+            self.apply_changes(store.load_archived(record))
+        if db_tasks:
+            self.archive_cursor = task_key(db_tasks[-1])
+        self.archive_exhausted = len(db_tasks) < PAGE_SIZE
+        self.scheduler.mark(self.tasks_view)
+
+    def page_stream(self, index: int) -> AsyncIterator[list]:
+        """Lotes da próxima página da aba `index`, a partir do seu cursor"""
+        return iter_tasks(
+            after=self.cursors[index],
+            completed=TAB_FILTERS[index],
+            batch_size=STREAM_BATCH,
+            limit=PAGE_SIZE,
+            list_id=self.list_id,
+        )
+
+    async def stream_page(self, index: int, stream: AsyncIterator[list], fetched=0):
+        """Exibe cada lote da página ao chegar; marca a aba esgotada no fim"""
+        store = self.store
+        async for db_tasks in stream:
+            if self.store is not store:
+                return  # A lista foi trocada durante a leitura
+            fetched += len(db_tasks)
+            self.apply_page(index, db_tasks)
+            self.scheduler.mark(self.tasks_view)
+        if fetched < PAGE_SIZE:
+            self.apply_page(index, [], exhausted=True)
+
+    def apply_page(self, index: int, db_tasks: list, exhausted: bool = False):
+        """Indexa um lote buscado na aba `index` e avança os cursores"""
+        for record in db_tasks:
+            if record.id not in self.store:
+                self.apply_changes(self.store.load(record))
+
+        if db_tasks:
+            self.cursors[index] = task_key(db_tasks[-1])
+        if exhausted:
+            self.exhausted[index] = True
+
+        # Uma página de "Todas" também cobre as demais abas até a mesma chave
+        if index == ALL:
+            for other in (ACTIVE, COMPLETED):
+                self.cursors[other] = max(self.cursors[other], self.cursors[ALL])
+                self.exhausted[other] = self.exhausted[other] or self.exhausted[ALL]
+
+    def build_task(self, record: TaskRecord) -> Task:
+        """Cria a linha que exibe um registro"""
+        return Task(
+            page=self.page,
+            record=record,
+            archived=self.store.is_archived(record),
+            due_picker=self.due_picker,
+            task_status_change=self.status_changed,
+            task_delete=self.task_delete,
+            task_edit=self.task_edit,
+            task_due_change=self.task_due_changed,
+            schedule_update=self.scheduler.mark,
+        )
+
+    def row(self, record: TaskRecord) -> Task:
+        """Linha exibida do registro, criada ao entrar no `ListView`"""
+        task = self.rows.get(record.id)
+        if task is None:
+            task = self.rows[record.id] = self.build_task(record)
+        return task
+
+    def refresh_rows(self, records: List[TaskRecord]):
+        """Reflete nas linhas exibidas o novo status dos registros"""
+        for record in records:
+            task = self.rows.get(record.id)
+            if task is not None:
+                task.update_task_appearance(update=False)
+
+    def apply_changes(self, changes: Changes):
+        """Replica no `ListView` as inserções/remoções feitas na aba exibida
+
+        As posições de cada aba no `TaskStore` coincidem com as do `ListView`,
+        que então envia apenas as linhas afetadas. Durante uma busca o
+        `ListView` exibe os resultados, e as posições não se aplicam.
+        """
+        if self.search_results is not None:
+            return
+        for tab, position, record in changes:
+            if tab != self.filter.selected_index:
+                continue
+            if record is not None:
+                self.tasks_view.controls.insert(position, self.row(record))
+            else:
+                removed = self.tasks_view.controls.pop(position)
+                self.rows.pop(removed.task_id, None)
+
+    @traced
+    async def task_reordered(self, event: ft.OnReorderEvent):
+        """Arrastar e soltar: grava a nova posição alterando só o rank da tarefa"""
+        old, new = event.old_index, event.new_index
+        if old is None or new is None or old == new:
+            return
+
+        controls = self.tasks_view.controls
+        if self.search_results is not None:
+            # Os resultados seguem a relevância: a ordem muda só na tela
+            self.search_results.insert(new, self.search_results.pop(old))
+            controls.insert(new, controls.pop(old))
+            self.scheduler.mark(self.tasks_view)
+            SnackBar(self.page, "A ordem não é salva durante a busca.")
+            return
+
+        if max(old, new) >= len(self.store.views[self.filter.selected_index]):
+            # As arquivadas ficam fora da ordem manual: desfaz o movimento na tela
+            controls.insert(new, controls.pop(old))
+            self.scheduler.flush()
+            self.update_tasks_view()
+            SnackBar(self.page, "Tarefas arquivadas não podem ser reordenadas.")
+            return
+
+        async with self.rank_lock:
+            # Os vizinhos precisam dos ranks definitivos
+            await self.adds_saved()
+            store = self.store
+            view = store.views[self.filter.selected_index]
+            record = view[old]
+            rank = await self.move_record(record, view, old, new)
+            if rank is None:
+                # Sem rank livre entre os vizinhos: renumera a lista e repete
+                # (após o rebalanceamento há `RANK_GAP` entre vizinhos)
+                await self.renumber()
+                rank = await self.move_record(record, view, old, new)
+            if store is not self.store:
+                return  # A lista foi trocada enquanto o rank era gravado
+            self.apply_changes(store.move(record, rank))
+            crowded = self.is_crowded(record, view)
+
+        self.scheduler.mark(self.tasks_view)
+        if crowded:
+            self.page.run_task(self.rebalance)
+
+    async def move_record(
+        self, record: TaskRecord, view: List[TaskRecord], old: int, new: int
+    ) -> Optional[int]:
+        """Grava o rank da tarefa entre os vizinhos da posição `new` da aba"""
+        others = view[:old] + view[old + 1 :]
+        after = others[new - 1] if new > 0 else None
+        before = others[new] if new < len(others) else None
+        return await move_task(
+            record.id,
+            self.list_id,
+            after=task_key(after) if after else None,
+            before=task_key(before) if before else None,
+        )
+
+    @staticmethod
+    def is_crowded(record: TaskRecord, view: List[TaskRecord]) -> bool:
+        """Se o rank ficou colado a um vizinho da aba (rebalancear em breve)"""
+        position = bisect_left(view, task_key(record), key=task_key)
+        neighbors = view[max(position - 1, 0) : position + 2]
+        return any(
+            other is not record and abs(other.rank - record.rank) < REBALANCE_GAP
+            for other in neighbors
+        )
+
+    @traced
+    async def rebalance(self):
+        """Rebalanceia a ordem manual da lista em segundo plano"""
+        async with self.rank_lock:
+            await self.renumber()
 
+    async def renumber(self):
+        """Renumera os ranks da lista e aplica os novos aos registros carregados
+
+        A ordem não muda, então as abas seguem ordenadas; cada cursor passa a
+        ser a chave da última tarefa carregada da aba até ele (nunca à frente
+        do que já foi lido, o que no máximo repete tarefas já carregadas).
+        """
+        store = self.store
+        await rebalance_ranks(self.list_id)
+        ranks = await get_ranks(list(store.tasks))
+        if store is not self.store:
+            return  # A lista foi trocada durante o rebalanceamento
+
+        anchors = {}
+        for index, cursor in self.cursors.items():
+            view = store.views[index]
+            position = bisect_right(view, cursor, key=task_key)
+            anchors[index] = view[position - 1] if position else None
+        store.set_ranks(ranks)
+        for index, anchor in anchors.items():
+            self.cursors[index] = task_key(anchor) if anchor else FIRST_KEY
+
+    @traced
+    async def tasks_scrolled(self, event: ft.OnScrollEvent):
+        """Busca mais tarefas quando a rolagem se aproxima do fim da lista"""
+        if (
+            self.search_results is None
+            and event.pixels >= event.max_scroll_extent - LOAD_THRESHOLD
+        ):
+            await self.load_more_tasks()
+
+    @traced
     def toggle_theme(self, event: ft.ControlEvent):
+        """Troca o tema na hora; a preferência é gravada em segundo plano"""
         if self.page.theme_mode == "DARK":
-            self.page.theme_mode = update_current_theme(1, "LIGHT")
+            self.page.theme_mode = "LIGHT"
             self.toggle_theme_button.icon = ft.Icons.DARK_MODE
         else:
-            self.page.theme_mode = update_current_theme(1, "DARK")
+            self.page.theme_mode = "DARK"
             self.toggle_theme_button.icon = ft.Icons.LIGHT_MODE
-        self.page.update()
+        settings.set("theme", self.page.theme_mode)
+        self.scheduler.mark()
+
+    def set_lists(self, task_lists: List[TaskList]):
+        """Preenche o seletor com as listas e seus totais (lidos via SQL)"""
+        self.task_lists = {task_list.id: task_list for task_list in task_lists}
+        self.list_picker.options = [
+            ft.dropdown.Option(key=str(task_list.id), text=self.list_label(task_list))
+            for task_list in task_lists
+        ]
+        self.scheduler.mark(self.list_picker)
+
+    @staticmethod
+    def list_label(task_list: TaskList) -> str:
+        return f"{task_list.name} ({task_list.completed}/{task_list.total})"
+
+    def refresh_list_label(self):
+        """Reflete no seletor os totais da lista exibida (mantidos pelo store)"""
+        current = self.task_lists.get(self.list_id)
+        if current is None:
+            return
+        current.total, current.completed = self.store.total, self.store.completed
+        current.archived = self.store.archived_total
+        key = str(current.id)
+        for option in self.list_picker.options:
+            if option.key == key:
+                option.text = self.list_label(current)
+                self.scheduler.mark(self.list_picker)
+                break
+
+    @traced
+    async def list_changed(self, event: ft.ControlEvent):
+        list_id = int(self.list_picker.value)
+        if list_id != self.list_id and list_id in self.task_lists:
+            await self.open_list(list_id)
+
+    async def open_list(self, list_id: int):
+        """Exibe outra lista: descarta os registros da atual e carrega a nova
 
-    def completed_tasks(self, tasks: list):
-        all_tasks = len(tasks)
-        completed_tasks = len([task for task in self.all_tasks if task.completed])
-        if all_tasks == 0:
+        Só a lista selecionada fica em memória; os totais dela já vêm de
+        `get_lists`, então nenhuma tarefa precisa ser lida para o rodapé.
+        """
+        self.list_id = list_id
+        self.list_picker.value = str(list_id)
+        settings.set("list", list_id)
+
+        current = self.task_lists[list_id]
+        self.store = TaskStore()
+        self.store.set_counts(current.total, current.completed, current.archived)
+        self.cursors = {index: FIRST_KEY for index in TAB_FILTERS}
+        self.exhausted = {index: False for index in TAB_FILTERS}
+        self.archive_cursor, self.archive_exhausted = FIRST_KEY, False
+        self.scheduler.mark(self.list_picker)
+        self.completed_tasks()
+        self.clear_completed_tasks_buttom_enable()
+
+        if self.search_results is not None:
+            # Descarta buscas em andamento na lista anterior
+            self.search_generation += 1
+            await self.run_search()
+            return
+
+        index = self.filter.selected_index
+        self.update_tasks_view()
+        self.loading = True
+        try:
+            await self.stream_page(index, self.page_stream(index))
+        finally:
+            await self.loading_done()
+
+    @traced
+    async def add_list_clicked(self, event: ft.ControlEvent):
+        @traced
+        async def create_list(name: str):
+            task_list = await add_list(name, now_epoch())
+            self.task_lists[task_list.id] = task_list
+            self.list_picker.options.append(
+                ft.dropdown.Option(
+                    key=str(task_list.id), text=self.list_label(task_list)
+                )
+            )
+            await self.open_list(task_list.id)
+            SnackBar(self.page, f"Lista '{name}' criada!")
+
+        PromptDialog(self.page, "Nova lista", "Nome da lista", create_list).open()
+
+    def completed_tasks(self):
+        self.refresh_list_label()
+        all_tasks = self.store.total
+        completed_tasks = self.store.completed
+        archived = self.store.archived_total
+        if all_tasks == 0 and not archived:
             self.items_left.value = f"Nenhuma tarefa adicionada."
         elif all_tasks == completed_tasks:
             self.items_left.value = f"Todas as tarefas concluídas."
@@ -275,141 +799,431 @@ class TodoApp(ft.Column):
             self.items_left.value = (
                 f"{completed_tasks}/{all_tasks} tarefa(s) concluída(s)."
             )
-        self.page.update()
+        if archived:
+            # Contadas à parte: as ações de "Concluídas" não as alteram
+            self.items_left.value += f" {archived} arquivada(s)."
+        self.scheduler.mark(self.items_left)
+
+    def archived_note(self) -> str:
+        """Aviso, nas ações em massa de concluídas, de que o arquivo fica de fora"""
+        if not self.store.archived_total:
+            return ""
+        return (
+            "\nAs tarefas arquivadas não são alteradas"
+            " (desmarque uma arquivada para restaurá-la)."
+        )
 
     def clear_completed_tasks_buttom_enable(self):
-        enabled = not any(task.completed for task in self.all_tasks)
+        enabled = not self.store.has_completed
         # Habilita/Desabilita o Limpar Concluídas
         (
             self.clear_completed_tasks.disabled,
             self.uncheck_completed_tasks.disabled,
         ) = (enabled, enabled)
 
-        self.update()
+        self.scheduler.mark(self.clear_completed_tasks, self.uncheck_completed_tasks)
 
+    @traced
     async def add_clicked(self, event: ft.ControlEvent):
+        """Exibe a nova tarefa na hora, com id provisório; a gravação segue em
+        segundo plano (`persist_add`) e, se falhar, a tarefa é retirada"""
+        name = self.new_task.value.strip()
+        if not name:
+            return
 
-        if self.new_task.value.strip():
-            db_task = await add_task(
-                name=self.new_task.value.strip(),
-                added=get_current_datetime(),
-                updated=get_current_datetime(),
-            )
-            task = Task(
-                page=self.page,
-                task_id=db_task.id,
-                task_name=db_task.name,
-                task_status_change=self.status_changed,
-                task_delete=self.task_delete,
-                task_edit=self.task_edit,
-                completed=False,
-                added_at=get_current_datetime(),
-                updated_at=get_current_datetime(),
-                # completed_at -> vazio
+        now = now_epoch()
+        provisional = next(self.provisional_ids)
+        record = TaskRecord(
+            id=provisional,
+            name=name,
+            completed=False,
+            rank=PROVISIONAL_RANK - provisional,
+            added_at=now,
+            completed_at=None,
+            updated_at=now,
+        )
+        self.apply_changes(self.store.add(record))
+        self.pending_adds[provisional] = asyncio.ensure_future(
+            self.persist_add(record, self.list_id)
+        )
+        self.new_task.value = ""
+        # Foco, rolagem e aviso vão no mesmo envio que a nova linha (o cliente
+        # rola depois de montá-la)
+        self.scheduler.defer(self.new_task, "focus")
+        self.completed_tasks()
+        self.on_resize(None)
+        self.scheduler.defer(self.tasks_view, "scroll_to", offset=-1, duration=300)
+
+        self.notify(f"Tarefa '{name}' adicionada com sucesso!")
+
+    def notify(self, message: str):
+        """Exibe o aviso no próximo envio do `scheduler`, junto com as demais
+        alterações do evento
+
+        Enquanto o aviso anterior está aberto, reabri-lo não o exibiria de
+        novo: nesse caso (ou antes de montado) vai um `SnackBar` à parte.
+        """
+        notice = self.notice
+        if notice.open or notice.uid is None:
+            SnackBar(self.page, message)
+            return
+        notice.content.value = message
+        notice.open = True
+        self.scheduler.mark(notice)
+
+    @traced
+    async def persist_add(self, record: TaskRecord, list_id: int):
+        """Grava uma tarefa adicionada e troca o id provisório pelo definitivo"""
+        provisional = record.id
+        try:
+            saved = await add_task(
+                name=record.name,
+                added=record.added_at,
+                updated=record.updated_at,
+                list_id=list_id,
             )
-            self.all_tasks.append(task)
-            self.new_task.value = ""
-            self.new_task.focus()
-            self.update_tasks_view()
-            self.completed_tasks(self.all_tasks)
-            self.on_resize(None)
+        except Exception:
+            if self.store.get(provisional) is record:
+                self.apply_changes(self.store.remove(record))
+                self.drop_search_result(record)
+                self.refresh_counts()
+            SnackBar(self.page, f"Não foi possível adicionar '{record.name}'.")
+            return
+        finally:
+            del self.pending_adds[provisional]
 
-            SnackBar(self.page, f"Tarefa '{task.task_name}' adicionada com sucesso!")
+        if self.store.get(provisional) is not record:
+            # Lista trocada (ou tarefa já removida da tela) durante a gravação
+            record.id, record.rank = saved.id, saved.rank
+            return
+        row = self.rows.pop(provisional, None)
+        changes = self.store.persisted(record, saved.id, saved.rank)
+        self.apply_changes(changes)
+        if row is not None and record.id not in self.rows:
+            # Continua na mesma posição: a linha exibida passa ao id definitivo
+            self.rows[record.id] = row
+        if changes:
+            self.scheduler.mark(self.tasks_view)
 
-    async def status_changed(self, task: Task):
-        await update_task_status(
-            task_id=task.task_id,
-            completed=task.completed,
-            updated_at=get_current_datetime(),
-            completed_at=get_current_datetime(),
+    async def saved(self, record: TaskRecord) -> bool:
+        """Aguarda a gravação de uma tarefa recém-adicionada (id provisório);
+        `False` se ela não pôde ser gravada"""
+        pending = self.pending_adds.get(record.id)
+        if pending is not None:
+            await pending
+        return record.id > 0
+
+    async def adds_saved(self):
+        """Aguarda todas as adições em andamento"""
+        if self.pending_adds:
+            await asyncio.gather(*self.pending_adds.values())
+
+    async def settle(self):
+        """Leva ao banco as adições e a fila de alterações (antes das
+        operações que leem ou alteram várias tarefas direto no banco)"""
+        await self.adds_saved()
+        await write_queue.flush()
+
+    def writes_failed(
+        self, statuses: Dict[int, PendingStatus], names: Dict[int, PendingName]
+    ):
+        """Desfaz na tela as alterações de um lote da `write_queue` que falhou"""
+        changed = []
+        for task_id, change in statuses.items():
+            record = self.store.get(task_id)
+            if record is None or record.completed == change.original:
+                continue
+            record.completed = change.original
+            if not record.completed:
+                record.completed_at = None
+            self.apply_changes(self.store.status_changed(record))
+            reminders.set(task_id, None if record.completed else record.due_at)
+            changed.append(record)
+        for task_id, change in names.items():
+            record = self.store.get(task_id)
+            if record is not None:
+                record.name = change.original
+                changed.append(record)
+        if not changed:
+            return
+
+        self.refresh_rows(changed)
+        self.refresh_counts(*(self.rows.get(record.id) for record in changed))
+        SnackBar(
+            self.page, "Não foi possível salvar as alterações; elas foram desfeitas."
         )
-        self.update_tasks_view()
+
+    @traced
+    async def status_changed(self, task: Task):
+        record = task.record
+        if self.store.is_archived(record):
+            await self.restore_archived(record)
+            return
+        record.updated_at = now_epoch()
+        record.completed_at = record.updated_at if record.completed else None
+        # Move a linha entre "Ativas" e "Concluídas"; em "Todas" nada muda
+        self.apply_changes(self.store.status_changed(record))
+        if self.filter.selected_index != ALL:
+            self.scheduler.mark(self.tasks_view)
+        self.clear_completed_tasks_buttom_enable()
+        self.completed_tasks()
+        # A gravação vai para a fila (se recém-adicionada, após obter o id)
+        if await self.saved(record):
+            write_queue.set_status(record.id, record.completed, record.updated_at)
+            # Concluída não tem lembrete; desmarcada volta a ter, se houver prazo
+            reminders.set(record.id, None if record.completed else record.due_at)
+
+    async def restore_archived(self, record: TaskRecord):
+        """Desmarcar uma arquivada a devolve às abas como ativa (na hora; se a
+        gravação falhar, ela volta ao arquivo)"""
+        store = self.store
+        completed_at = record.completed_at
+        record.updated_at = now_epoch()
+        record.completed_at = None
+        self.apply_changes(store.restore(record))
+        store.archived_total -= 1
+        self.refresh_counts()
+        try:
+            await restore_archived_task(record.id, record.updated_at)
+        except Exception:
+            if store is self.store and store.get(record.id) is record:
+                self.apply_changes(store.remove(record))
+                record.completed, record.completed_at = True, completed_at
+                self.apply_changes(store.load_archived(record))
+                store.archived_total += 1
+                self.refresh_rows([record])
+                self.refresh_counts(self.rows.get(record.id))
+            SnackBar(self.page, f"Não foi possível restaurar '{record.name}'.")
+
+    def refresh_counts(self, *rows: Task):
+        """Envia a lista (e as linhas informadas) e atualiza rodapé e menus"""
+        self.scheduler.mark(self.tasks_view, *(row for row in rows if row))
         self.clear_completed_tasks_buttom_enable()
-        self.completed_tasks(self.all_tasks)
+        self.completed_tasks()
+
+    def drop_search_result(self, record: TaskRecord):
+        """Retira dos resultados exibidos uma tarefa que saiu da lista"""
+        if self.search_results is not None and record.id in self.rows:
+            self.search_results = [
+                result for result in self.search_results if result is not record
+            ]
+            self.tasks_view.controls.remove(self.rows.pop(record.id))
 
+    @traced
     async def task_delete(self, task: Task):
-        if task.task_id:
-            await delete_task(task.task_id)
+        """Retira a tarefa da tela na hora; se a exclusão falhar, ela volta"""
+        store, record = self.store, task.record
+        archived, found = store.is_archived(record), store.is_found(record)
+        if archived:
+            self.apply_changes(store.remove_archived(record))
+            store.archived_total -= 1
+        else:
+            self.apply_changes(store.remove(record))
+        self.drop_search_result(record)
+        self.refresh_counts()
 
-        self.all_tasks.remove(task)
-        self.update_tasks_view()
-        self.completed_tasks(self.all_tasks)
+        try:
+            if archived:
+                await delete_archived_task(record.id)
+            elif await self.saved(record):
+                await delete_task(record.id, now_epoch())
+                write_queue.discard(record.id)
+                reminders.discard(record.id)
+                maintenance.schedule()
+        except Exception:
+            if store is self.store:
+                if archived:
+                    self.apply_changes(store.load_archived(record))
+                    store.archived_total += 1
+                else:
+                    self.apply_changes(store.add(record, found))
+                self.refresh_counts()
+            SnackBar(self.page, f"Não foi possível remover '{record.name}'.")
+            return
+
+        SnackBar(self.page, f"Tarefa '{record.name}' removida com sucesso!")
+
+    @traced
+    async def tasks_archived(self, archived: List[Tuple[int, int]]):
+        """Retira da memória as tarefas que o `maintenance` moveu para o arquivo
+
+        Todas estavam concluídas, então os totais são ajustados sem reler o
+        banco. As carregadas passam ao arquivo exibido, se ele já chegou à
+        posição delas; senão chegam com as próximas páginas do arquivo.
+        """
+        for task_id, list_id in archived:
+            task_list = self.task_lists.get(list_id)
+            if task_list is None:
+                continue
+            if list_id != self.list_id:
+                task_list.total -= 1
+                task_list.completed -= 1
+                task_list.archived += 1
+                continue
+            self.store.archived_total += 1
+            record = self.store.get(task_id)
+            if record is None:
+                self.store.total -= 1
+                self.store.completed -= 1
+                continue
+            self.apply_changes(self.store.remove(record))
+            self.drop_search_result(record)
+            if self.archive_exhausted or task_key(record) <= self.archive_cursor:
+                self.apply_changes(self.store.load_archived(record))
+
+        self.set_lists(list(self.task_lists.values()))
+        self.scheduler.mark(self.tasks_view)
+        self.completed_tasks()
         self.clear_completed_tasks_buttom_enable()
-        SnackBar(self.page, f"Tarefa '{task.task_name}' removida com sucesso!")
 
+    @traced
     async def uncheck_clicked(self, event: ft.ControlEvent):
-        if not any(task.completed for task in self.all_tasks):
+        if not self.store.has_completed:
             SnackBar(self.page, "Não há tarefas concluídas para desmarcar.")
             return
 
+        @traced
         async def confirm_uncheck():
-            tasks_to_uncheck = [task for task in self.all_tasks if task.completed]
+            await self.settle()
 
-            for task in tasks_to_uncheck:
-                task.completed = False
-                task.update_task_appearance()
-                if task.task_id:
-                    await update_task_status(
-                        task_id=task.task_id,
-                        completed=False,
-                        updated_at=get_current_datetime(),
-                        completed_at=get_current_datetime(),
-                    )
+            changed = await update_all_tasks_status(
+                completed=False, updated_at=now_epoch(), list_id=self.list_id
+            )
 
-            self.update_tasks_view()
-            self.completed_tasks(self.all_tasks)
+            changed_tasks = self.store.uncheck_all()
+            self.refresh_rows(changed_tasks)
+            # Desmarcadas (inclusive as não carregadas) com prazo voltam a ter lembrete
+            reminders.refresh()
+
+            self.cursors[ACTIVE] = min(self.cursors[ACTIVE], self.cursors[COMPLETED])
+            self.exhausted[ACTIVE] = (
+                self.exhausted[ACTIVE] and self.exhausted[COMPLETED]
+            )
+            self.exhausted[COMPLETED] = True
+
+            self.update_tasks_view(changed_tasks)
+            self.completed_tasks()
             self.clear_completed_tasks_buttom_enable()
-            self.page.update()
 
-            SnackBar(self.page, f"{len(tasks_to_uncheck)} tarefas desmarcadas!")
+            SnackBar(self.page, f"{changed} tarefas desmarcadas!")
 
         ConfirmDialog(
             self.page,
             "Confirmar",
-            "Tem certeza que deseja desmarcar todas as tarefas concluídas?",
+            "Tem certeza que deseja desmarcar todas as tarefas concluídas?"
+            + self.archived_note(),
             confirm_uncheck,
             True,
         ).open()
 
+    @traced
     async def clear_clicked(self, event: ft.ControlEvent):
+        @traced
         async def confirm_clear():
-            tasks_to_remove = [task for task in self.all_tasks if task.completed]
-            task_ids = [task.task_id for task in tasks_to_remove if task.task_id]
+            await self.settle()
 
-            if task_ids:
-                await delete_many_tasks(task_ids)
+            # Remove também as concluídas que ainda não foram carregadas
+            removed = await delete_completed_tasks(now_epoch(), self.list_id)
+            maintenance.schedule()
 
-            self.all_tasks = [task for task in self.all_tasks if not task.completed]
+            self.store.remove_completed()
+            self.exhausted[COMPLETED] = True
+            if self.search_results is not None:
+                self.search_results = [
+                    record for record in self.search_results if not record.completed
+                ]
 
             self.update_tasks_view()
-            self.completed_tasks(self.all_tasks)
+            self.completed_tasks()
             self.clear_completed_tasks_buttom_enable()
-            SnackBar(self.page, f"{len(tasks_to_remove)} tarefas concluídas removidas!")
+            SnackBar(self.page, f"{removed} tarefas concluídas removidas!")
 
         ConfirmDialog(
             self.page,
             "Confirmar",
-            "Tem certeza que deseja limpar todas as tarefas concluídas?",
+            "Tem certeza que deseja limpar todas as tarefas concluídas?"
+            + self.archived_note(),
             confirm_clear,
             True,
         ).open()
 
-    def update_tasks_view(self):
-        self.tasks_view.controls.clear()
+    @traced
+    def update_tasks_view(self, changed_tasks: List[TaskRecord] = ()):
+        """Reexibe a aba selecionada (ou os resultados da busca)
 
-        if self.filter.selected_index == 0:
-            # todas as tarefas
-            filtered_tasks = self.all_tasks
-        elif self.filter.selected_index == 1:
-            # tarefas não concluídas (compreensão de lista)
-            filtered_tasks = [task for task in self.all_tasks if not task.completed]
+        Usado na troca de aba e nas operações em massa. As linhas são criadas
+        só para os registros exibidos, e as que saem da tela são descartadas;
+        das `changed_tasks`, as que continuam visíveis são reenviadas, já que
+        cada `Task` é isolada e não entra no diff do `ListView`.
+        """
+        index = self.filter.selected_index
+        if self.search_results is not None:
+            records = self.search_results
+        elif index == COMPLETED:
+            records = self.store.views[COMPLETED] + self.store.archived
         else:
-            # tarefas concluídas (compreensão de lista)
-            filtered_tasks = [task for task in self.all_tasks if task.completed]
+            records = self.store.views[index]
+
+        mounted, self.rows = self.rows, {}
+        for record in records:
+            task = mounted.get(record.id)
+            self.rows[record.id] = task or self.build_task(record)
+        controls = list(self.rows.values())
+        # Reenvia as alteradas que já estavam montadas e continuam na tela
+        visible = [
+            mounted[record.id]
+            for record in changed_tasks
+            if record.id in mounted and record.id in self.rows
+        ]
 
-        self.tasks_view.controls.extend(filtered_tasks)
-        self.update()
+        self.tasks_view.controls = controls
+        self.scheduler.mark(self.tasks_view, *visible)
 
-    def tabs_changed(self, event: ft.ControlEvent):
+    @traced
+    async def tabs_changed(self, event: ft.ControlEvent):
         self.on_resize(event)
+        if self.search_results is not None or (self.search.value or "").strip():
+            # A busca é refeita com o filtro da nova aba; as anteriores, ainda
+            # em andamento, são descartadas
+            self.search_generation += 1
+            await self.run_search()
+            return
+        self.update_tasks_view()
+        # Garante ao menos uma página de linhas na aba recém-selecionada
+        if len(self.tasks_view.controls) < PAGE_SIZE:
+            await self.load_more_tasks()
+
+    @traced
+    async def search_changed(self, event: ft.ControlEvent):
+        """Consulta a busca só após uma pausa na digitação (debounce)"""
+        self.search_generation += 1
+        generation = self.search_generation
+        await asyncio.sleep(SEARCH_DEBOUNCE)
+        if generation == self.search_generation:
+            await self.run_search()
+
+    @traced
+    async def run_search(self):
+        """Busca pelo nome (FTS5) combinada com o filtro da aba atual"""
+        query = (self.search.value or "").strip()
+        if not query:
+            if self.search_results is not None:
+                self.search_results = None
+                self.update_tasks_view()
+            return
+
+        generation = self.search_generation
+        # Alterações ainda na fila precisam estar no banco para a busca
+        await self.settle()
+        db_tasks = await search_tasks(
+            query,
+            limit=SEARCH_LIMIT,
+            completed=TAB_FILTERS[self.filter.selected_index],
+            list_id=self.list_id,
+        )
+        if generation != self.search_generation:
+            return  # Já existe uma busca mais recente
+
+        # As não carregadas ficam fora das abas (`TaskStore.found`)
+        self.search_results = self.store.set_found(db_tasks)
         self.update_tasks_view()
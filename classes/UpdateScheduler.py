@@ -0,0 +1,99 @@
+import threading
+from typing import Dict
+import flet as ft
+
+
+def _no_update():
+    pass
+
+
+class UpdateScheduler:
+    """Agrupa as atualizações de um evento em um único `page.update()`
+
+    Em vez de chamar `update()` a cada alteração, os handlers marcam os
+    controles alterados com `mark`. O envio acontece uma vez, na próxima
+    volta do loop do app (ou após `delay` segundos, para agrupar um quadro),
+    e só inclui os controles que o diff de um ancestral marcado não cobre.
+    """
+
+    def __init__(self, page: ft.Page, delay: float = 0):
+        self.page = page
+        self.delay = delay
+        self._dirty: Dict[int, ft.Control] = {}
+        self._scheduled = False
+        self._lock = threading.Lock()
+
+    def mark(self, *controls: ft.Control):
+        """Marca controles para o próximo envio (sem argumentos: a página)"""
+        with self._lock:
+            for control in controls or (self.page,):
+                self._dirty.setdefault(id(control), control)
+            if self._scheduled:
+                return
+            self._scheduled = True
+
+        # Pode ser chamado a partir dos handlers síncronos (thread pool)
+        self.page.loop.call_soon_threadsafe(self._arm)
+
+    def defer(self, control: ft.Control, method: str, *args, **kwargs):
+        """Chama um método do flet que altera atributos e envia na hora
+        (`focus`, `scroll_to`), deixando o envio para o próximo `flush`"""
+        control.update = _no_update
+        try:
+            getattr(control, method)(*args, **kwargs)
+        finally:
+            del control.update
+        self.mark(control)
+
+    def _arm(self):
+        if self.delay:
+            self.page.loop.call_later(self.delay, self.flush)
+        else:
+            self.flush()
+
+    def flush(self):
+        """Envia agora todas as alterações marcadas"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            self._scheduled = False
+
+        controls = [
+            control
+            for control in dirty.values()
+            if self._is_mounted(control) and not self._is_covered(control, dirty)
+        ]
+        if controls:
+            # Os mais internos primeiro: ainda estão montados mesmo que o
+            # diff de um ancestral (enviado depois) venha a removê-los
+            controls.sort(key=self._depth, reverse=True)
+            self.page.update(*controls)
+
+    def _is_mounted(self, control: ft.Control) -> bool:
+        # Linhas nunca exibidas ou já removidas não têm o que enviar
+        return control is self.page or (
+            control.uid is not None and control.page is not None
+        )
+
+    @staticmethod
+    def _depth(control: ft.Control) -> int:
+        depth = 0
+        parent = control.parent
+        while parent is not None:
+            depth += 1
+            parent = parent.parent
+        return depth
+
+    def _is_covered(self, control: ft.Control, dirty: Dict[int, ft.Control]) -> bool:
+        """Se o diff de um ancestral marcado já inclui o controle"""
+        if control is self.page or control.is_isolated():
+            # O diff do ancestral para nos atributos do controle isolado
+            return False
+        parent = control.parent
+        while parent is not None:
+            if id(parent) in dirty:
+                return True
+            if parent.is_isolated():
+                # O diff de quem está acima não entra em controles isolados
+                return False
+            parent = parent.parent
+        return id(self.page) in dirty
@@ -1,7 +1,19 @@
 from .ConfirmationDialog import ConfirmDialog
+from .PromptDialog import PromptDialog
 from .SnackBar import SnackBar
 from .Task import Task
+from .TaskStore import TaskStore
 from .TextField import TextField
+from .UpdateScheduler import UpdateScheduler
 from .TodoApp import TodoApp
 
-__all__ = ["ConfirmDialog", "SnackBar", "Task", "TextField", "TodoApp"]
+__all__ = [
+    "ConfirmDialog",
+    "PromptDialog",
+    "SnackBar",
+    "Task",
+    "TaskStore",
+    "TextField",
+    "UpdateScheduler",
+    "TodoApp",
+]
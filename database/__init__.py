@@ -1,20 +1,61 @@
-from .db import init_db
+from .db import init_db, close_db
 from .db import add_task
-from .db import get_tasks
-from .db import delete_task, delete_many_tasks
+from .db import get_tasks, iter_tasks, get_tasks_page, count_tasks
+from .db import get_lists, add_list
+from .db import search_tasks
+from .db import delete_task, delete_many_tasks, delete_completed_tasks
 from .db import update_task_status
-from .db import update_task_name
-from .db import get_current_theme
-from .db import update_current_theme
+from .db import update_many_task_status, update_all_tasks_status
+from .db import update_task_name, update_task_due
+from .db import apply_task_changes
+from .db import move_task, rebalance_ranks, get_ranks
+from .db import archive_completed_tasks, get_archived_page, count_archived
+from .db import restore_archived_task, delete_archived_task
+from .db import get_due_tasks, get_task
+from .write_behind import WriteBehindQueue, write_queue
+from .settings import SettingsStore, settings
+from .maintenance import MaintenanceJob, maintenance
+from .reminders import ReminderScheduler, reminders
+from .transfer import import_tasks, export_tasks
 
 __all__ = [
     "init_db",
+    "close_db",
     "add_task",
     "get_tasks",
+    "iter_tasks",
+    "get_tasks_page",
+    "count_tasks",
+    "get_lists",
+    "add_list",
+    "search_tasks",
     "delete_task",
     "delete_many_tasks",
+    "delete_completed_tasks",
     "update_task_status",
+    "update_many_task_status",
+    "update_all_tasks_status",
     "update_task_name",
-    "get_current_theme",
-    "update_current_theme",
+    "update_task_due",
+    "apply_task_changes",
+    "move_task",
+    "rebalance_ranks",
+    "get_ranks",
+    "archive_completed_tasks",
+    "get_archived_page",
+    "count_archived",
+    "restore_archived_task",
+    "delete_archived_task",
+    "get_due_tasks",
+    "get_task",
+    "WriteBehindQueue",
+    "write_queue",
+    "SettingsStore",
+    "settings",
+    "MaintenanceJob",
+    "maintenance",
+    "ReminderScheduler",
+    "reminders",
+    "import_tasks",
+    "export_tasks",
 ]
@@ -0,0 +1,67 @@
+import argparse
+import asyncio
+from typing import Optional
+from .db import DEFAULT_LIST_ID, init_db, close_db
+from .transfer import CHUNK_SIZE, Rejected, export_tasks, import_tasks
+
+# Linhas recusadas listadas no fim da importação (as demais só são contadas)
+MAX_REJECTED_SHOWN = 20
+
+
+def print_progress(done: int, total: Optional[int]):
+    suffix = f"/{total}" if total is not None else ""
+    print(f"\r{done}{suffix} tarefas", end="", flush=True)
+
+
+def print_rejected(rejected: Rejected):
+    for line, reason in rejected[:MAX_REJECTED_SHOWN]:
+        print(f"Linha {line} ignorada: {reason}")
+    if len(rejected) > MAX_REJECTED_SHOWN:
+        print(f"... e mais {len(rejected) - MAX_REJECTED_SHOWN} linhas ignoradas.")
+
+
+async def run_command(
+    command: str, path: str, chunk_size: int, list_id: Optional[int]
+) -> int:
+    await init_db()
+    try:
+        if command == "import":
+            rejected: Rejected = []
+            imported = await import_tasks(
+                path, chunk_size, print_progress, list_id or DEFAULT_LIST_ID, rejected
+            )
+            if rejected:
+                print()
+                print_rejected(rejected)
+            return imported
+        return await export_tasks(path, chunk_size, print_progress, list_id)
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m database",
+        description="Importa/exporta tarefas do todo.db em CSV, JSON ou JSONL.",
+    )
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("path", help="arquivo .csv, .json (array) ou .jsonl")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument(
+        "--list",
+        type=int,
+        dest="list_id",
+        help="id da lista (importação: padrão 1; exportação: todas)",
+    )
+    args = parser.parse_args()
+
+    try:
+        count = asyncio.run(
+            run_command(args.command, args.path, args.chunk_size, args.list_id)
+        )
+    except ValueError as error:
+        # Formato não suportado ou `.json` malformado (na importação, os
+        # lotes anteriores ao erro já foram gravados)
+        raise SystemExit(f"\nErro: {error}")
+    done = "importadas" if args.command == "import" else "exportadas"
+    print(f"\n{count} tarefas {done}.")
@@ -0,0 +1,122 @@
+import aiosqlite
+import asyncio
+from contextlib import asynccontextmanager
+from itertools import cycle
+from typing import AsyncIterator, Iterator, List, Optional
+from utils import span, trace_attribute
+
+
+class ConnectionManager:
+    """Mantém conexões persistentes com o SQLite durante o ciclo de vida do app.
+
+    Uma única conexão de escrita é compartilhada por todas as operações, e um
+    pool opcional de conexões somente leitura atende consultas concorrentes.
+    Os PRAGMAs são aplicados uma única vez na abertura e o cache de statements
+    do `sqlite3` passa a ser reaproveitado entre as chamadas.
+
+    Toda escrita passa por `transaction()`: como a conexão é uma só, o
+    `commit` (ou `rollback`) de uma corrotina levaria junto os statements que
+    outra deixou pela metade.
+    """
+
+    # `auto_vacuum` só vale para bancos novos (antes da primeira tabela); os
+    # existentes são convertidos por `db.enable_incremental_vacuum`
+    PRAGMAS = (
+        "PRAGMA auto_vacuum = INCREMENTAL",
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA foreign_keys = ON",
+        "PRAGMA temp_store = MEMORY",
+    )
+
+    def __init__(self, database: str, readers: int = 0, cached_statements: int = 256):
+        self.database = database
+        self.readers = readers
+        self.cached_statements = cached_statements
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._readers: List[aiosqlite.Connection] = []
+        self._reader_cycle: Optional[Iterator[aiosqlite.Connection]] = None
+        # Um lock por loop: o banco é aberto e fechado fora do loop do app
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._write_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def open(self):
+        """Abre a conexão de escrita e o pool de leitores (idempotente)"""
+        if self.is_open:
+            return
+
+        with span("sqlite.connect"):
+            self._writer = await aiosqlite.connect(
+                self.database, cached_statements=self.cached_statements
+            )
+        trace_attribute(self._writer, "commit", "sqlite.commit")
+        self._writer.row_factory = aiosqlite.Row
+        for pragma in self.PRAGMAS:
+            await self._writer.execute(pragma)
+
+        for _ in range(self.readers):
+            with span("sqlite.connect"):
+                reader = await aiosqlite.connect(
+                    f"file:{self.database}?mode=ro",
+                    uri=True,
+                    cached_statements=self.cached_statements,
+                )
+            reader.row_factory = aiosqlite.Row
+            await reader.execute("PRAGMA query_only = ON")
+            self._readers.append(reader)
+
+        if self._readers:
+            self._reader_cycle = cycle(self._readers)
+
+    async def close(self):
+        """Fecha todas as conexões abertas"""
+        for reader in self._readers:
+            await reader.close()
+        self._readers.clear()
+        self._reader_cycle = None
+
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
+
+    async def writer(self) -> aiosqlite.Connection:
+        """Retorna a conexão de escrita, abrindo-a sob demanda"""
+        if not self.is_open:
+            await self.open()
+        return self._writer
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Conexão de escrita exclusiva até o fim do bloco, que é confirmado
+        ao sair ou desfeito se houver exceção (inclusive cancelamento)"""
+        conn = await self.writer()
+        async with self.write_lock():
+            if conn.in_transaction:
+                # Com o lock, só pode ser uma transação deixada pela metade
+                # por um loop já encerrado: não é confirmada junto com esta
+                await conn.rollback()
+            try:
+                yield conn
+                await conn.commit()
+            except BaseException:
+                await conn.rollback()
+                raise
+
+    def write_lock(self) -> asyncio.Lock:
+        """Lock das escritas no loop atual"""
+        loop = asyncio.get_running_loop()
+        if self._write_lock_loop is not loop:
+            self._write_lock, self._write_lock_loop = asyncio.Lock(), loop
+        return self._write_lock
+
+    async def reader(self) -> aiosqlite.Connection:
+        """Retorna uma conexão de leitura do pool (ou a de escrita, se não houver pool)"""
+        if not self.is_open:
+            await self.open()
+        if self._reader_cycle is None:
+            return self._writer
+        return next(self._reader_cycle)
@@ -1,38 +1,88 @@
-import aiosqlite
-import sqlite3
 import os
-from typing import List, Optional
+import json
+import logging
+import sqlite3
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from dataclasses import dataclass
+from .connection import ConnectionManager
+from .migrations import migrate
+from utils import traced
+
+logger = logging.getLogger("todo.db")
 
 
-@dataclass
+@dataclass(slots=True)
 class Task:
+    """Registro compacto (`__slots__`) de uma tarefa: é a fonte da verdade em
+    memória, e as linhas da interface só existem enquanto são exibidas"""
+
     id: int
     name: str
     completed: bool
-    added_at: str
-    completed_at: str
-    updated_at: str
+    # Posição na lista (ordem manual): as tarefas são ordenadas por `(rank, id)`
+    rank: int
+    # Instantes em segundos desde a época (`utils.now_epoch`)
+    added_at: int
+    completed_at: Optional[int]
+    updated_at: Optional[int]
+    # Prazo (época) para o lembrete, ou `None` sem prazo
+    due_at: Optional[int] = None
+
 
+@dataclass(slots=True)
+class TaskList:
+    """Lista de tarefas com os totais calculados no SQLite"""
 
-@dataclass
-class Theme:
     id: int
-    current_theme: str
+    name: str
+    total: int = 0
+    completed: int = 0
+    # Tarefas movidas para `archived_tasks` (fora de `total`)
+    archived: int = 0
 
 
 DATABASE_FILE = "todo.db"
 
+# Lista criada pela migração, que recebe as tarefas anteriores às listas
+DEFAULT_LIST_ID = 1
+
+# Chave de ordenação `(rank, id)`, usada também como cursor da paginação
+TaskKey = Tuple[int, int]
+
+# Chave anterior a qualquer tarefa (início da paginação)
+FIRST_KEY: TaskKey = (-(1 << 63), 0)
+
+# Intervalo entre ranks vizinhos: uma tarefa movida recebe o ponto médio entre
+# os vizinhos, o que permite ~16 movimentos no mesmo lugar antes de rebalancear
+RANK_GAP = 1 << 16
+
+# `PRAGMA auto_vacuum`: o arquivo só encolhe quando o `MaintenanceJob` pede
+AUTO_VACUUM_INCREMENTAL = 2
+
+# Conexões persistentes compartilhadas por todas as operações abaixo
+manager = ConnectionManager(DATABASE_FILE)
+
+# Falso quando o índice FTS5 não existe (SQLite sem FTS5): a busca usa LIKE
+fts5_available = True
+
 
 # Tasks Operations
 
 
+@traced
 async def init_db():
-    """Inicializa o banco de dados de forma assíncrona"""
-    if os.path.exists(DATABASE_FILE):
-        return  # Já existe, não precisa inicializar
+    """Abre as conexões persistentes e inicializa o banco de dados"""
+    from .settings import settings
+
+    exists = os.path.exists(DATABASE_FILE)
 
-    async with aiosqlite.connect(DATABASE_FILE) as conn:
+    if exists:
+        # Banco existente: só aplica as migrações pendentes
+        await migrate(manager)
+        await settings.load()
+        return
+
+    async with manager.transaction() as conn:
         await conn.execute(
             """
             CREATE TABLE IF NOT EXISTS tasks (
@@ -63,72 +113,413 @@ async def init_db():
         await conn.execute(
             "INSERT OR IGNORE INTO theme (id, current_theme) VALUES (1, 'dark')"
         )
-        await conn.commit()
-
-
-async def add_task(name: str, added: str, updated: str) -> Task:
-    """Adiciona uma nova tarefa"""
-    async with aiosqlite.connect(DATABASE_FILE) as conn:
-        async with conn.cursor() as cursor:
-            await cursor.execute(
-                "INSERT INTO tasks (name, completed, added_at, updated_at) VALUES (?,?,?,?)",
-                (name, 0, added, updated),
-            )
-            await conn.commit()
-            return Task(
-                id=cursor.lastrowid,
-                name=name,
-                completed=False,
-                added_at=added,
-                completed_at="",
-                updated_at=updated,
-            )
-
-
-async def get_tasks() -> List[Task]:
-    """Retorna todas as tarefas"""
-    async with aiosqlite.connect(DATABASE_FILE) as conn:
-        conn.row_factory = aiosqlite.Row
-        async with conn.execute(
-            "SELECT id, name, completed, added_at, completed_at, updated_at FROM tasks ORDER BY id"
-        ) as cursor:
-            rows = await cursor.fetchall()
-            return [
+    await migrate(manager)
+    await settings.load()
+
+
+@traced
+async def close_db():
+    """Grava as alterações pendentes e fecha as conexões (encerramento do app)"""
+    from .maintenance import maintenance
+    from .reminders import reminders
+    from .settings import settings
+    from .write_behind import write_queue
+
+    # A limpeza das excluídas é interrompida; o restante fica para a próxima sessão.
+    # Uma etapa que falha não impede as seguintes, e a conexão sempre é fechada
+    try:
+        for step in (
+            maintenance.stop,
+            reminders.stop,
+            write_queue.flush,
+            settings.flush,
+        ):
+            try:
+                await step()
+            except Exception:
+                logger.exception("Falha no encerramento (%s)", step.__qualname__)
+    finally:
+        await manager.close()
+
+
+@traced
+async def add_task(
+    name: str, added: int, updated: int, list_id: int = DEFAULT_LIST_ID
+) -> Task:
+    """Adiciona uma nova tarefa ao fim da lista `list_id`"""
+    async with manager.transaction() as conn:
+        rank = await next_rank(conn, list_id)
+        cursor = await conn.execute(
+            "INSERT INTO tasks (list_id, name, completed, rank, added_at, updated_at)"
+            " VALUES (?,?,?,?,?,?)",
+            (list_id, name, 0, rank, added, updated),
+        )
+    return Task(
+        id=cursor.lastrowid,
+        name=name,
+        completed=False,
+        rank=rank,
+        added_at=added,
+        completed_at=None,
+        updated_at=updated,
+    )
+
+
+@traced
+async def get_tasks(list_id: Optional[int] = None) -> List[Task]:
+    """Retorna todas as tarefas (da lista `list_id`, se informada)"""
+    return [task async for batch in iter_tasks(list_id=list_id) for task in batch]
+
+
+@traced
+async def iter_tasks(
+    after: TaskKey = FIRST_KEY,
+    completed: Optional[bool] = None,
+    batch_size: int = 500,
+    limit: Optional[int] = None,
+    list_id: Optional[int] = None,
+) -> AsyncIterator[List[Task]]:
+    """Entrega as tarefas após a chave `after`, em lotes, à medida que são lidas
+
+    Gerador assíncrono sobre um único cursor: o primeiro lote fica disponível
+    sem esperar as linhas seguintes, qualquer que seja o tamanho da tabela.
+    Com `list_id`, lê só a lista informada (índices por lista).
+    """
+    conn = await manager.reader()
+    query = (
+        "SELECT id, name, completed, rank, added_at, completed_at, updated_at, due_at"
+        " FROM tasks"
+    )
+    query += " WHERE deleted_at IS NULL AND (rank, id) > (?, ?)"
+    params: list = [*after]
+    if list_id is not None:
+        query += " AND list_id = ?"
+        params.append(list_id)
+    if completed is not None:
+        query += " AND completed = ?"
+        params.append(completed)
+    query += " ORDER BY rank, id"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    async with conn.execute(query, params) as cursor:
+        while rows := await cursor.fetchmany(batch_size):
+            yield [
                 Task(
                     id=row["id"],
                     name=row["name"],
                     completed=bool(row["completed"]),
+                    rank=row["rank"],
                     added_at=row["added_at"],
                     completed_at=row["completed_at"],
                     updated_at=row["updated_at"],
+                    due_at=row["due_at"],
                 )
                 for row in rows
             ]
 
 
-async def delete_task(task_id: int):
-    """Remove uma tarefa"""
-    async with aiosqlite.connect(DATABASE_FILE) as conn:
-        await conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-        await conn.commit()
+@traced
+async def get_tasks_page(
+    after: TaskKey = FIRST_KEY,
+    limit: int = 50,
+    completed: Optional[bool] = None,
+    list_id: Optional[int] = None,
+) -> List[Task]:
+    """Retorna a próxima página de tarefas após a chave `after` (paginação por chave)"""
+    conn = await manager.reader()
+    query = (
+        "SELECT id, name, completed, rank, added_at, completed_at, updated_at, due_at"
+        " FROM tasks"
+    )
+    query += " WHERE deleted_at IS NULL AND (rank, id) > (?, ?)"
+    params: list = [*after]
+    if list_id is not None:
+        query += " AND list_id = ?"
+        params.append(list_id)
+    if completed is not None:
+        query += " AND completed = ?"
+        params.append(completed)
+    query += " ORDER BY rank, id LIMIT ?"
+    params.append(limit)
+
+    async with conn.execute(query, params) as cursor:
+        return [
+            Task(
+                id=row["id"],
+                name=row["name"],
+                completed=bool(row["completed"]),
+                rank=row["rank"],
+                added_at=row["added_at"],
+                completed_at=row["completed_at"],
+                updated_at=row["updated_at"],
+                due_at=row["due_at"],
+            )
+            async for row in cursor
+        ]
+
+
+@traced
+async def count_tasks(list_id: Optional[int] = None) -> Tuple[int, int]:
+    """Retorna `(total, concluídas)` calculados no próprio SQLite"""
+    conn = await manager.reader()
+    query = "SELECT COUNT(*), COALESCE(SUM(completed), 0) FROM tasks"
+    query += " WHERE deleted_at IS NULL"
+    params: list = []
+    if list_id is not None:
+        query += " AND list_id = ?"
+        params.append(list_id)
+    async with conn.execute(query, params) as cursor:
+        total, completed = await cursor.fetchone()
+        return total, completed
+
+
+# Lists Operations
+
+
+@traced
+async def get_lists() -> List[TaskList]:
+    """Retorna as listas com `(total, concluídas, arquivadas)` de cada uma,
+    em uma consulta
+
+    Os totais saem de um `GROUP BY` sobre o índice parcial (só tarefas vivas)
+    `(list_id, completed, rank, id)`, e as arquivadas do índice
+    `(list_id, rank, id)` do arquivo, sem carregar nenhuma tarefa.
+    """
+    conn = await manager.reader()
+    async with conn.execute(
+        """
+        SELECT l.id, l.name, COALESCE(t.total, 0) AS total,
+            COALESCE(t.completed, 0) AS completed,
+            COALESCE(a.archived, 0) AS archived
+        FROM lists l
+        LEFT JOIN (
+            SELECT list_id, COUNT(*) AS total, SUM(completed) AS completed
+            FROM tasks WHERE deleted_at IS NULL
+            GROUP BY list_id
+        ) t ON t.list_id = l.id
+        LEFT JOIN (
+            SELECT list_id, COUNT(*) AS archived FROM archived_tasks
+            GROUP BY list_id
+        ) a ON a.list_id = l.id
+        ORDER BY l.id
+        """
+    ) as cursor:
+        return [
+            TaskList(
+                id=row["id"],
+                name=row["name"],
+                total=row["total"],
+                completed=row["completed"],
+                archived=row["archived"],
+            )
+            async for row in cursor
+        ]
+
+
+@traced
+async def add_list(name: str, added: int) -> TaskList:
+    """Cria uma lista vazia"""
+    async with manager.transaction() as conn:
+        cursor = await conn.execute(
+            "INSERT INTO lists (name, added_at) VALUES (?, ?)", (name, added)
+        )
+    return TaskList(id=cursor.lastrowid, name=name)
+
+
+@traced
+def build_search_query(text: str) -> str:
+    """Converte o texto digitado em uma consulta FTS5 por prefixo
+    (`"com"* "pão"*`), escapando aspas"""
+    terms = text.replace('"', '""').split()
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+@traced
+async def search_tasks(
+    query: str,
+    limit: int = 50,
+    completed: Optional[bool] = None,
+    list_id: Optional[int] = None,
+) -> List[Task]:
+    """Busca tarefas pelo nome, por prefixo, ordenadas por relevância"""
+    global fts5_available
+
+    if not query.strip():
+        return []
+
+    if fts5_available:
+        try:
+            return await _search_tasks(query, limit, completed, list_id, fts=True)
+        except sqlite3.OperationalError as error:
+            if "no such" not in str(error):
+                raise
+            fts5_available = False
+
+    return await _search_tasks(query, limit, completed, list_id, fts=False)
+
+
+async def _search_tasks(
+    query: str,
+    limit: int,
+    completed: Optional[bool],
+    list_id: Optional[int],
+    fts: bool,
+) -> List[Task]:
+    conn = await manager.reader()
+    if fts:
+        sql = """
+            SELECT t.id, t.name, t.completed, t.rank, t.added_at, t.completed_at,
+                t.updated_at, t.due_at
+            FROM tasks_fts JOIN tasks t ON t.id = tasks_fts.rowid
+            WHERE tasks_fts MATCH ? AND t.deleted_at IS NULL
+        """
+        params: list = [build_search_query(query)]
+    else:
+        sql = """
+            SELECT t.id, t.name, t.completed, t.rank, t.added_at, t.completed_at,
+                t.updated_at, t.due_at
+            FROM tasks t WHERE t.name LIKE ? AND t.deleted_at IS NULL
+        """
+        params = [f"%{query.strip()}%"]
+    if list_id is not None:
+        sql += " AND t.list_id = ?"
+        params.append(list_id)
+    if completed is not None:
+        sql += " AND t.completed = ?"
+        params.append(completed)
+    sql += (
+        " ORDER BY tasks_fts.rank LIMIT ?" if fts else " ORDER BY t.rank, t.id LIMIT ?"
+    )
+    params.append(limit)
+
+    async with conn.execute(sql, params) as cursor:
+        return [
+            Task(
+                id=row["id"],
+                name=row["name"],
+                completed=bool(row["completed"]),
+                rank=row["rank"],
+                added_at=row["added_at"],
+                completed_at=row["completed_at"],
+                updated_at=row["updated_at"],
+                due_at=row["due_at"],
+            )
+            async for row in cursor
+        ]
+
+
+@traced
+async def delete_task(task_id: int, deleted_at: int):
+    """Exclui uma tarefa (exclusão lógica: a linha some na próxima limpeza)"""
+    async with manager.transaction() as conn:
+        await conn.execute(
+            "UPDATE tasks SET deleted_at = ? WHERE id = ? AND deleted_at IS NULL",
+            (deleted_at, task_id),
+        )
 
 
-async def delete_many_tasks(task_ids: List[int]):
-    """Remove múltiplas tarefas"""
+@traced
+async def delete_many_tasks(task_ids: List[int], deleted_at: int) -> int:
+    """Exclui múltiplas tarefas em um único statement (exclusão lógica)"""
     if not task_ids:
-        return
+        return 0
+
+    async with manager.transaction() as conn:
+        # Um único parâmetro JSON, qualquer que seja o número de ids
+        cursor = await conn.execute(
+            """
+            UPDATE tasks SET deleted_at = ?
+            WHERE id IN (SELECT value FROM json_each(?)) AND deleted_at IS NULL
+            """,
+            (deleted_at, json.dumps(task_ids)),
+        )
+    return cursor.rowcount
 
-    async with aiosqlite.connect(DATABASE_FILE) as conn:
-        placeholders = ",".join("?" * len(task_ids))
-        await conn.execute(f"DELETE FROM tasks WHERE id IN ({placeholders})", task_ids)
-        await conn.commit()
 
+@traced
+async def delete_completed_tasks(deleted_at: int, list_id: Optional[int] = None) -> int:
+    """Exclui todas as tarefas concluídas (da lista `list_id`, se informada)"""
+    query = "UPDATE tasks SET deleted_at = ? WHERE completed = 1 AND deleted_at IS NULL"
+    params: list = [deleted_at]
+    if list_id is not None:
+        query += " AND list_id = ?"
+        params.append(list_id)
+    async with manager.transaction() as conn:
+        cursor = await conn.execute(query, params)
+    return cursor.rowcount
 
+
+# Purge Operations
+
+
+@traced
+async def purge_deleted_tasks(limit: int = 500) -> int:
+    """Remove de fato até `limit` tarefas excluídas, em uma transação curta
+
+    As remoções (e os triggers da busca) ficam fora das ações do usuário;
+    chamada em laço pelo `MaintenanceJob`. Retorna o número de linhas removidas.
+    """
+    async with manager.transaction() as conn:
+        cursor = await conn.execute(
+            """
+            DELETE FROM tasks WHERE id IN (
+                SELECT id FROM tasks WHERE deleted_at IS NOT NULL LIMIT ?
+            )
+            """,
+            (limit,),
+        )
+    return cursor.rowcount
+
+
+@traced
+async def pragma_value(conn, name: str) -> int:
+    async with conn.execute(f"PRAGMA {name}") as cursor:
+        (value,) = await cursor.fetchone()
+    return value
+
+
+@traced
+async def incremental_vacuum(pages: int = 256) -> int:
+    """Devolve ao sistema até `pages` páginas livres do arquivo (requer
+    `auto_vacuum = INCREMENTAL`). Retorna quantas páginas ainda estão livres."""
+    async with manager.transaction() as conn:
+        # O `sqlite3` executa só o primeiro passo do PRAGMA, que libera uma
+        # página; `executemany` repete o passo `pages` vezes em uma só chamada
+        await conn.executemany("PRAGMA incremental_vacuum(1)", [()] * pages)
+        return await pragma_value(conn, "freelist_count")
+
+
+@traced
+async def enable_incremental_vacuum() -> bool:
+    """Converte o banco para `auto_vacuum = INCREMENTAL` com um `VACUUM`
+    completo (só é necessário uma vez, em bancos criados sem essa opção)
+
+    Retorna `False` se a conexão estiver em uso por uma transação ou por uma
+    leitura em andamento (tente depois).
+    """
+    conn = await manager.writer()
+    if await pragma_value(conn, "auto_vacuum") == AUTO_VACUUM_INCREMENTAL:
+        return True
+    # O VACUUM não roda dentro de uma transação: espera as escritas em curso
+    async with manager.write_lock():
+        if conn.in_transaction:
+            return False
+        await conn.execute(f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}")
+        try:
+            await conn.execute("VACUUM")
+        except sqlite3.OperationalError:
+            return False
+    return True
+
+
+@traced
 async def update_task_status(
-    task_id: int, completed: bool, updated_at: str, completed_at: str
+    task_id: int, completed: bool, updated_at: int, completed_at: Optional[int]
 ):
     """Atualiza o status"""
-    async with aiosqlite.connect(DATABASE_FILE) as conn:
+    async with manager.transaction() as conn:
         await conn.execute(
             "UPDATE tasks SET completed = ?, updated_at = ?, completed_at = ? WHERE id = ?",
             (
@@ -139,38 +530,372 @@ async def update_task_status(
             ),
         )
 
-        await conn.commit()
 
+@traced
+async def update_many_task_status(
+    task_ids: List[int], completed: bool, updated_at: int
+) -> int:
+    """Atualiza o status de várias tarefas em um único statement e commit"""
+    if not task_ids:
+        return 0
 
-async def update_task_name(task_id: int, new_name: str, updated_at: str):
+    async with manager.transaction() as conn:
+        # `json_each` recebe todos os ids em um único parâmetro, sem esbarrar
+        # no limite de variáveis do SQLite
+        cursor = await conn.execute(
+            """
+            UPDATE tasks SET completed = ?, updated_at = ?, completed_at = ?
+            WHERE id IN (SELECT value FROM json_each(?))
+            """,
+            (
+                completed,
+                updated_at,
+                updated_at if completed else None,
+                json.dumps(task_ids),
+            ),
+        )
+    return cursor.rowcount
+
+
+@traced
+async def update_all_tasks_status(
+    completed: bool, updated_at: int, list_id: Optional[int] = None
+) -> int:
+    """Marca/desmarca todas as tarefas (da lista `list_id`, se informada) que
+    ainda não estão no status informado"""
+    query = """
+        UPDATE tasks SET completed = ?, updated_at = ?, completed_at = ?
+        WHERE completed = ? AND deleted_at IS NULL
+    """
+    params: list = [
+        completed,
+        updated_at,
+        updated_at if completed else None,
+        not completed,
+    ]
+    if list_id is not None:
+        query += " AND list_id = ?"
+        params.append(list_id)
+    async with manager.transaction() as conn:
+        cursor = await conn.execute(query, params)
+    return cursor.rowcount
+
+
+@traced
+async def update_task_name(task_id: int, new_name: str, updated_at: int):
     """Atualiza o nome"""
-    async with aiosqlite.connect(DATABASE_FILE) as conn:
+    async with manager.transaction() as conn:
         await conn.execute(
             "UPDATE tasks SET name = ?, updated_at = ? WHERE id = ?",
             (new_name, updated_at, task_id),
         )
-        await conn.commit()
 
 
-# Theme Operations (sync)
+@traced
+async def update_task_due(task_id: int, due_at: Optional[int], updated_at: int):
+    """Define o prazo (`None` remove)"""
+    async with manager.transaction() as conn:
+        await conn.execute(
+            "UPDATE tasks SET due_at = ?, updated_at = ? WHERE id = ?",
+            (due_at, updated_at, task_id),
+        )
+
+
+@traced
+async def apply_task_changes(
+    statuses: List[Tuple[bool, int, int]], names: List[Tuple[str, int, int]]
+):
+    """Aplica alterações de status `(completed, updated_at, id)` e de nome
+    `(name, updated_at, id)` em uma única transação"""
+    async with manager.transaction() as conn:
+        if statuses:
+            await conn.executemany(
+                """
+                UPDATE tasks SET completed = ?1, updated_at = ?2,
+                    completed_at = CASE WHEN ?1 THEN ?2 END
+                WHERE id = ?3
+                """,
+                statuses,
+            )
+        if names:
+            await conn.executemany(
+                "UPDATE tasks SET name = ?, updated_at = ? WHERE id = ?", names
+            )
 
 
-def get_current_theme(theme_id: int = 1) -> Optional[str]:
-    """Obtém o tema atual (versão síncrona)"""
-    with sqlite3.connect(DATABASE_FILE) as conn:
-        conn.row_factory = sqlite3.Row
-        cursor = conn.execute(
-            "SELECT current_theme FROM theme WHERE id = ?", (theme_id,)
-        )
-        row = cursor.fetchone()
-        return row["current_theme"] if row else None
+# Archive Operations
 
 
-def update_current_theme(theme_id: int, new_theme: str) -> str:
-    """Atualiza o tema (versão síncrona)"""
-    with sqlite3.connect(DATABASE_FILE) as conn:
-        conn.execute(
-            "UPDATE theme SET current_theme = ? WHERE id = ?", (new_theme, theme_id)
+@traced
+async def archive_completed_tasks(
+    before: int, archived_at: int, limit: int = 500
+) -> List[Tuple[int, int]]:
+    """Move para `archived_tasks` até `limit` tarefas concluídas antes de
+    `before`, em uma transação curta; retorna `(id, list_id)` das arquivadas
+
+    Chamada em laço pelo `MaintenanceJob`, fora das ações do usuário.
+    """
+    # Seleção, cópia e remoção em uma única transação exclusiva
+    async with manager.transaction() as conn:
+        async with conn.execute(
+            """
+            SELECT id, list_id FROM tasks
+            WHERE completed_at < ? AND completed = 1 AND deleted_at IS NULL
+            LIMIT ?
+            """,
+            (before, limit),
+        ) as cursor:
+            archived = [(row["id"], row["list_id"]) async for row in cursor]
+        if not archived:
+            return []
+
+        ids = json.dumps([task_id for task_id, _ in archived])
+        await conn.execute(
+            """
+            INSERT INTO archived_tasks (id, list_id, name, rank, added_at,
+                completed_at, updated_at, archived_at)
+            SELECT id, list_id, name, rank, added_at, completed_at, updated_at, ?
+            FROM tasks WHERE id IN (SELECT value FROM json_each(?))
+            """,
+            (archived_at, ids),
+        )
+        await conn.execute(
+            "DELETE FROM tasks WHERE id IN (SELECT value FROM json_each(?))", (ids,)
         )
-        conn.commit()
-        return new_theme
+    return archived
+
+
+@traced
+async def get_archived_page(
+    after: TaskKey = FIRST_KEY, limit: int = 50, list_id: Optional[int] = None
+) -> List[Task]:
+    """Próxima página de tarefas arquivadas após a chave `after` (sempre concluídas)"""
+    conn = await manager.reader()
+    query = """
+        SELECT id, name, rank, added_at, completed_at, updated_at
+        FROM archived_tasks WHERE (rank, id) > (?, ?)
+    """
+    params: list = [*after]
+    if list_id is not None:
+        query += " AND list_id = ?"
+        params.append(list_id)
+    query += " ORDER BY rank, id LIMIT ?"
+    params.append(limit)
+
+    async with conn.execute(query, params) as cursor:
+        return [
+            Task(
+                id=row["id"],
+                name=row["name"],
+                completed=True,
+                rank=row["rank"],
+                added_at=row["added_at"],
+                completed_at=row["completed_at"],
+                updated_at=row["updated_at"],
+            )
+            async for row in cursor
+        ]
+
+
+@traced
+async def count_archived(list_id: Optional[int] = None) -> int:
+    """Total de tarefas arquivadas (da lista `list_id`, se informada)"""
+    conn = await manager.reader()
+    query = "SELECT COUNT(*) FROM archived_tasks"
+    params: list = []
+    if list_id is not None:
+        query += " WHERE list_id = ?"
+        params.append(list_id)
+    async with conn.execute(query, params) as cursor:
+        (total,) = await cursor.fetchone()
+        return total
+
+
+@traced
+async def restore_archived_task(task_id: int, updated_at: int):
+    """Devolve uma tarefa arquivada a `tasks` como ativa (desmarcada), com o
+    mesmo id e a mesma posição na lista"""
+    async with manager.transaction() as conn:
+        await conn.execute(
+            """
+            INSERT INTO tasks (id, list_id, name, completed, rank, added_at,
+                completed_at, updated_at)
+            SELECT id, list_id, name, 0, rank, added_at, NULL, ?
+            FROM archived_tasks WHERE id = ?
+            """,
+            (updated_at, task_id),
+        )
+        await conn.execute("DELETE FROM archived_tasks WHERE id = ?", (task_id,))
+
+
+@traced
+async def delete_archived_task(task_id: int):
+    """Remove uma tarefa arquivada (fora do índice da busca, a remoção é direta)"""
+    async with manager.transaction() as conn:
+        await conn.execute("DELETE FROM archived_tasks WHERE id = ?", (task_id,))
+
+
+# Reminder Operations
+
+
+@traced
+async def get_due_tasks(
+    after: TaskKey, until: int, limit: int = 10000
+) -> List[TaskKey]:
+    """`(due_at, id)` dos lembretes pendentes após a chave `after` e com prazo
+    até `until`, em ordem de prazo, de todas as listas
+
+    Consulta por intervalo no índice parcial `idx_tasks_due` (que já cobre as
+    colunas), sem tocar nas linhas da tabela.
+    """
+    conn = await manager.reader()
+    async with conn.execute(
+        """
+        SELECT due_at, id FROM tasks
+        WHERE (due_at, id) > (?, ?) AND due_at <= ?
+            AND due_at IS NOT NULL AND completed = 0 AND deleted_at IS NULL
+        ORDER BY due_at, id LIMIT ?
+        """,
+        (*after, until, limit),
+    ) as cursor:
+        return [(row["due_at"], row["id"]) async for row in cursor]
+
+
+@traced
+async def get_task(task_id: int) -> Optional[Task]:
+    """Tarefa viva (não excluída nem arquivada) com o id informado"""
+    conn = await manager.reader()
+    async with conn.execute(
+        """
+        SELECT id, name, completed, rank, added_at, completed_at, updated_at, due_at
+        FROM tasks WHERE id = ? AND deleted_at IS NULL
+        """,
+        (task_id,),
+    ) as cursor:
+        row = await cursor.fetchone()
+    if row is None:
+        return None
+    return Task(
+        id=row["id"],
+        name=row["name"],
+        completed=bool(row["completed"]),
+        rank=row["rank"],
+        added_at=row["added_at"],
+        completed_at=row["completed_at"],
+        updated_at=row["updated_at"],
+        due_at=row["due_at"],
+    )
+
+
+# Rank Operations
+
+
+@traced
+async def next_rank(conn, list_id: int) -> int:
+    """Rank após a última tarefa da lista (uma busca no índice por lista)"""
+    async with conn.execute(
+        "SELECT COALESCE(MAX(rank), 0) FROM tasks"
+        " WHERE list_id = ? AND deleted_at IS NULL",
+        (list_id,),
+    ) as cursor:
+        (last,) = await cursor.fetchone()
+    return last + RANK_GAP
+
+
+@traced
+def rank_between(after: Optional[TaskKey], before: Optional[TaskKey]) -> Optional[int]:
+    """Rank estritamente entre as chaves vizinhas (`None` = sem vizinho), ou
+    `None` se não houver rank livre entre elas"""
+    if after is None and before is None:
+        return RANK_GAP
+    if after is None:
+        return before[0] - RANK_GAP
+    if before is None:
+        return after[0] + RANK_GAP
+    if before[0] - after[0] < 2:
+        return None
+    return (after[0] + before[0]) // 2
+
+
+@traced
+async def move_task(
+    task_id: int,
+    list_id: int,
+    after: Optional[TaskKey],
+    before: Optional[TaskKey],
+) -> Optional[int]:
+    """Move a tarefa para entre as chaves vizinhas `after` e `before` (`None`
+    = ponta da lista), atualizando apenas a linha da própria tarefa
+
+    Sem `before` (destino no fim da parte carregada), o vizinho seguinte é
+    lido do banco. Retorna o novo rank, ou `None` se não houver rank livre
+    entre os vizinhos (a lista precisa de `rebalance_ranks`).
+    """
+    async with manager.transaction() as conn:
+        if before is None and after is not None:
+            async with conn.execute(
+                """
+                SELECT rank, id FROM tasks
+                WHERE list_id = ? AND deleted_at IS NULL
+                    AND (rank, id) > (?, ?) AND id != ?
+                ORDER BY rank, id LIMIT 1
+                """,
+                (list_id, *after, task_id),
+            ) as cursor:
+                row = await cursor.fetchone()
+            before = (row["rank"], row["id"]) if row else None
+
+        rank = rank_between(after, before)
+        if rank is None:
+            return None
+        await conn.execute("UPDATE tasks SET rank = ? WHERE id = ?", (rank, task_id))
+    return rank
+
+
+@traced
+async def rebalance_ranks(list_id: int) -> int:
+    """Redistribui os ranks da lista a cada `RANK_GAP`, mantendo a ordem
+
+    Tudo em SQL e em uma transação: as posições vêm de uma tabela temporária
+    preenchida na ordem `(rank, id)`. Retorna o número de tarefas renumeradas.
+    """
+    async with manager.transaction() as conn:
+        await conn.execute(
+            """
+            CREATE TEMP TABLE IF NOT EXISTS rank_order (
+                position INTEGER PRIMARY KEY,
+                id INTEGER NOT NULL UNIQUE
+            )
+            """
+        )
+        await conn.execute(
+            "INSERT INTO rank_order (id)"
+            " SELECT id FROM tasks WHERE list_id = ? AND deleted_at IS NULL"
+            " ORDER BY rank, id",
+            (list_id,),
+        )
+        cursor = await conn.execute(
+            """
+            UPDATE tasks SET rank = ? * (
+                SELECT position FROM rank_order WHERE rank_order.id = tasks.id
+            )
+            WHERE list_id = ? AND deleted_at IS NULL
+            """,
+            (RANK_GAP, list_id),
+        )
+        await conn.execute("DELETE FROM rank_order")
+    return cursor.rowcount
+
+
+@traced
+async def get_ranks(task_ids: List[int]) -> Dict[int, int]:
+    """Ranks atuais das tarefas informadas (ex.: após um rebalanceamento)"""
+    if not task_ids:
+        return {}
+
+    conn = await manager.reader()
+    async with conn.execute(
+        "SELECT id, rank FROM tasks WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps(task_ids),),
+    ) as cursor:
+        return {row["id"]: row["rank"] async for row in cursor}
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+from typing import Awaitable, Callable, List, Optional, Tuple
+from .db import archive_completed_tasks
+from .db import enable_incremental_vacuum, incremental_vacuum, purge_deleted_tasks
+from .settings import settings
+from .write_behind import write_queue
+from utils import now_epoch, traced
+
+# Idade (dias desde a conclusão) a partir da qual uma tarefa concluída vai
+# para o arquivo; configurável pela preferência `archive_days` (0 desativa)
+ARCHIVE_DAYS = 30
+
+
+class MaintenanceJob:
+    """Limpeza do banco em segundo plano, nos momentos ociosos.
+
+    Primeiro arquiva, em lotes, as tarefas concluídas há mais de
+    `archive_days` dias (avisando `on_archived` a cada lote).
+    As exclusões só marcam as tarefas (`deleted_at`). Este job as remove de
+    fato `idle_delay` segundos após a última exclusão, em lotes de
+    `chunk_size` linhas por transação, com uma pausa entre os lotes para que
+    as operações do usuário passem na frente. Depois devolve ao sistema as
+    páginas livres do arquivo (`incremental_vacuum`), também em lotes; bancos
+    criados sem `auto_vacuum` são convertidos uma única vez com um `VACUUM`.
+    """
+
+    def __init__(
+        self,
+        idle_delay: float = 5.0,
+        chunk_size: int = 500,
+        vacuum_pages: int = 256,
+        pause: float = 0.05,
+    ):
+        self.idle_delay = idle_delay
+        self.chunk_size = chunk_size
+        self.vacuum_pages = vacuum_pages
+        self.pause = pause
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._task: Optional[asyncio.Task] = None
+        self._rerun = False
+        self._stopping = False
+        self._incremental = False
+        # Chamado com `(id, list_id)` de cada lote arquivado (ex.: para a tela)
+        self.on_archived: Optional[
+            Callable[[List[Tuple[int, int]]], Awaitable[None]]
+        ] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Define o loop em que as limpezas agendadas serão executadas"""
+        self._loop = loop
+        self._stopping = False
+
+    def schedule(self):
+        """Agenda uma limpeza para quando o app ficar ocioso (cada chamada
+        adia a limpeza por mais `idle_delay` segundos)"""
+        loop = self._loop
+        if loop is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return  # Sem loop: as excluídas aguardam a próxima limpeza
+
+        loop.call_soon_threadsafe(self._arm_timer, loop)
+
+    @traced
+    async def run(self):
+        """Arquiva as concluídas antigas, remove as excluídas e compacta o
+        arquivo, sempre em lotes"""
+        days = settings.get("archive_days", ARCHIVE_DAYS)
+        while days and not self._stopping:
+            # Alterações pendentes (ex.: uma tarefa desmarcada) antes do lote
+            await write_queue.flush()
+            now = now_epoch()
+            archived = await archive_completed_tasks(
+                now - days * 86400, now, self.chunk_size
+            )
+            if archived and self.on_archived is not None:
+                await self.on_archived(archived)
+            if len(archived) < self.chunk_size:
+                break
+            await asyncio.sleep(self.pause)
+
+        while not self._stopping:
+            removed = await purge_deleted_tasks(self.chunk_size)
+            if removed < self.chunk_size:
+                break
+            await asyncio.sleep(self.pause)
+
+        if self._stopping:
+            return
+        if not self._incremental:
+            # `False` se outra operação estiver no meio de uma transação
+            self._incremental = await enable_incremental_vacuum()
+            if not self._incremental:
+                self._rerun = True
+                return
+
+        free = await incremental_vacuum(self.vacuum_pages)
+        while free and not self._stopping:
+            await asyncio.sleep(self.pause)
+            previous, free = free, await incremental_vacuum(self.vacuum_pages)
+            if free >= previous:
+                break  # Páginas liberadas por outra operação: fica para a próxima
+
+    async def stop(self):
+        """Cancela a limpeza agendada e aguarda o fim do lote em andamento"""
+        with self._lock:
+            self._stopping = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            task = self._task
+        if task is None or task.done():
+            return
+        if task.get_loop() is not asyncio.get_running_loop():
+            # Criada no loop do app, já encerrado (`close_db` fora dele): não
+            # há como aguardá-la daqui, e o lote interrompido é desfeito na
+            # próxima transação
+            return
+        await asyncio.gather(task, return_exceptions=True)
+
+    def _arm_timer(self, loop: asyncio.AbstractEventLoop):
+        with self._lock:
+            if self._stopping:
+                return
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = loop.call_later(self.idle_delay, self._start_run, loop)
+
+    def _start_run(self, loop: asyncio.AbstractEventLoop):
+        with self._lock:
+            self._timer = None
+            if self._task is not None and not self._task.done():
+                # Exclusões durante a limpeza: nova rodada quando ela terminar
+                self._rerun = True
+                return
+            self._rerun = False
+            self._task = loop.create_task(self.run())
+            self._task.add_done_callback(self._run_done)
+
+    def _run_done(self, task: asyncio.Task):
+        with self._lock:
+            rerun = self._rerun and not self._stopping
+        if rerun:
+            self._arm_timer(task.get_loop())
+
+
+# Limpeza compartilhada, iniciada pelo app e interrompida em `close_db`
+maintenance = MaintenanceJob()
@@ -0,0 +1,321 @@
+import sqlite3
+from typing import Awaitable, Callable, List
+from .connection import ConnectionManager
+
+# Cada migração recebe a conexão já dentro da transação e não deve fazer
+# commit. A versão do esquema é o número de migrações aplicadas, guardado em
+# `PRAGMA user_version`, então novas migrações entram sempre no fim da lista.
+Migration = Callable[..., Awaitable[None]]
+
+
+async def add_task_indexes(conn):
+    """Índices usados pelas consultas filtradas e paginadas"""
+    # Paginação por id dentro de cada aba ("Ativas"/"Concluídas")
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks (completed, id)"
+    )
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_tasks_updated_at ON tasks (updated_at)"
+    )
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_tasks_completed_at ON tasks (completed_at)"
+    )
+
+
+async def add_search_index(conn):
+    """Índice FTS5 dos nomes, mantido em sincronia com `tasks` por triggers"""
+    try:
+        await conn.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+                name,
+                content = 'tasks',
+                content_rowid = 'id',
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+            """
+        )
+    except sqlite3.OperationalError:
+        return  # SQLite sem FTS5: `search_tasks` usa LIKE
+
+    await create_search_triggers(conn)
+    await conn.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+
+
+async def create_search_triggers(conn):
+    """Triggers que replicam em `tasks_fts` as alterações de `tasks`"""
+    await conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts (rowid, name) VALUES (new.id, new.name);
+        END
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, name)
+            VALUES ('delete', old.id, old.name);
+        END
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF name ON tasks
+        BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, name)
+            VALUES ('delete', old.id, old.name);
+            INSERT INTO tasks_fts (rowid, name) VALUES (new.id, new.name);
+        END
+        """
+    )
+
+
+async def table_exists(conn, name: str) -> bool:
+    async with conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ) as cursor:
+        return await cursor.fetchone() is not None
+
+
+async def rebuild_tasks(conn, schema: str, select: str):
+    """Recria `tasks` com as colunas de `schema`, copiando as linhas via `select`
+
+    Mantém os ids, a sequência do AUTOINCREMENT e os triggers da busca; os
+    índices são removidos com a tabela antiga e ficam a cargo da migração.
+    """
+    await conn.execute(f"CREATE TABLE tasks_new ({schema})")
+    await conn.execute(f"INSERT INTO tasks_new {select}")
+    # Mantém a sequência do AUTOINCREMENT (não reutiliza ids já excluídos)
+    await conn.execute("DELETE FROM sqlite_sequence WHERE name = 'tasks_new'")
+    await conn.execute(
+        "UPDATE sqlite_sequence SET name = 'tasks_new' WHERE name = 'tasks'"
+    )
+    # Remove também os índices e triggers da tabela antiga
+    await conn.execute("DROP TABLE tasks")
+    await conn.execute("ALTER TABLE tasks_new RENAME TO tasks")
+
+    if await table_exists(conn, "tasks_fts"):
+        # Os ids são os mesmos, então o conteúdo de `tasks_fts` continua válido
+        await create_search_triggers(conn)
+
+
+async def convert_timestamps_to_epoch(conn):
+    """Troca as datas em texto (`%Y-%m-%d %H:%M:%S`, horário local) por
+    inteiros em segundos desde a época, reconstruindo a tabela `tasks`"""
+    # Textos inválidos viram NULL (ou o instante da migração, em `added_at`)
+    await rebuild_tasks(
+        conn,
+        """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        completed INTEGER DEFAULT 0,
+        added_at INTEGER NOT NULL,
+        completed_at INTEGER,
+        updated_at INTEGER
+        """,
+        """
+        (id, name, completed, added_at, completed_at, updated_at)
+        SELECT
+            id,
+            name,
+            completed,
+            COALESCE(
+                CAST(strftime('%s', added_at, 'utc') AS INTEGER),
+                CAST(strftime('%s', 'now') AS INTEGER)
+            ),
+            CAST(strftime('%s', completed_at, 'utc') AS INTEGER),
+            CAST(strftime('%s', updated_at, 'utc') AS INTEGER)
+        FROM tasks
+        """,
+    )
+    await add_task_indexes(conn)
+
+
+async def add_settings_table(conn):
+    """Preferências chave/valor (JSON) no lugar da tabela `theme`
+
+    O tema (sempre `dark`/`light`) é copiado como string JSON sem depender da
+    extensão JSON1.
+    """
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        ) WITHOUT ROWID
+        """
+    )
+    if await table_exists(conn, "theme"):
+        await conn.execute(
+            """
+            INSERT OR IGNORE INTO settings (key, value)
+            SELECT 'theme', '"' || current_theme || '"' FROM theme WHERE id = 1
+            """
+        )
+        await conn.execute("DROP TABLE theme")
+
+
+async def add_task_lists(conn):
+    """Listas nomeadas: tabela `lists` e `tasks.list_id` (chave estrangeira)
+
+    Com as chaves estrangeiras ativas, o SQLite não aceita `ADD COLUMN ...
+    REFERENCES` com padrão não nulo, então `tasks` é reconstruída; as tarefas
+    existentes vão para a lista padrão (id 1).
+    """
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS lists (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            added_at INTEGER NOT NULL
+        )
+        """
+    )
+    await conn.execute(
+        """
+        INSERT OR IGNORE INTO lists (id, name, added_at)
+        VALUES (1, 'Geral', CAST(strftime('%s', 'now') AS INTEGER))
+        """
+    )
+    await rebuild_tasks(
+        conn,
+        """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        list_id INTEGER NOT NULL DEFAULT 1
+            REFERENCES lists (id) ON DELETE CASCADE,
+        name TEXT NOT NULL,
+        completed INTEGER DEFAULT 0,
+        added_at INTEGER NOT NULL,
+        completed_at INTEGER,
+        updated_at INTEGER
+        """,
+        """
+        (id, list_id, name, completed, added_at, completed_at, updated_at)
+        SELECT id, 1, name, completed, added_at, completed_at, updated_at
+        FROM tasks
+        """,
+    )
+    # Paginação por id dentro de cada lista e de cada aba da lista; o segundo
+    # também cobre os totais por lista (`COUNT`/`SUM(completed)`)
+    await conn.execute("CREATE INDEX idx_tasks_list ON tasks (list_id, id)")
+    await conn.execute(
+        "CREATE INDEX idx_tasks_list_completed ON tasks (list_id, completed, id)"
+    )
+    await conn.execute("CREATE INDEX idx_tasks_updated_at ON tasks (updated_at)")
+    await conn.execute("CREATE INDEX idx_tasks_completed_at ON tasks (completed_at)")
+
+
+async def add_task_ranks(conn):
+    """Ordem manual: coluna `rank` (ordenação por `(rank, id)`), inicialmente
+    na ordem dos ids, com o intervalo de `db.RANK_GAP` entre vizinhos"""
+    await conn.execute("ALTER TABLE tasks ADD COLUMN rank INTEGER NOT NULL DEFAULT 0")
+    await conn.execute("UPDATE tasks SET rank = id * 65536")
+    # A paginação passa a ser por `(rank, id)` dentro da lista e da aba
+    await conn.execute("DROP INDEX IF EXISTS idx_tasks_list")
+    await conn.execute("DROP INDEX IF EXISTS idx_tasks_list_completed")
+    await conn.execute("CREATE INDEX idx_tasks_list_rank ON tasks (list_id, rank, id)")
+    await conn.execute(
+        "CREATE INDEX idx_tasks_list_completed_rank"
+        " ON tasks (list_id, completed, rank, id)"
+    )
+
+
+async def add_tombstones(conn):
+    """Exclusão lógica: `deleted_at` marca a tarefa até a limpeza em segundo
+    plano (`db.purge_deleted_tasks`)
+
+    Os índices da paginação passam a ser parciais, só com as tarefas vivas,
+    então as excluídas não custam nada às consultas; um índice das excluídas
+    localiza os lotes da limpeza.
+    """
+    await conn.execute("ALTER TABLE tasks ADD COLUMN deleted_at INTEGER")
+    await conn.execute("DROP INDEX IF EXISTS idx_tasks_list_rank")
+    await conn.execute("DROP INDEX IF EXISTS idx_tasks_list_completed_rank")
+    await conn.execute(
+        "CREATE INDEX idx_tasks_live_rank ON tasks (list_id, rank, id)"
+        " WHERE deleted_at IS NULL"
+    )
+    await conn.execute(
+        "CREATE INDEX idx_tasks_live_completed_rank"
+        " ON tasks (list_id, completed, rank, id) WHERE deleted_at IS NULL"
+    )
+    await conn.execute(
+        "CREATE INDEX idx_tasks_deleted ON tasks (deleted_at)"
+        " WHERE deleted_at IS NOT NULL"
+    )
+
+
+async def add_archive_table(conn):
+    """Arquivo das tarefas concluídas há muito tempo (`db.archive_completed_tasks`)
+
+    Mesmas colunas de `tasks` (menos `completed`, sempre verdadeiro), mantendo
+    os ids; fica fora do índice da busca e das consultas das abas.
+    """
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS archived_tasks (
+            id INTEGER PRIMARY KEY,
+            list_id INTEGER NOT NULL REFERENCES lists (id) ON DELETE CASCADE,
+            name TEXT NOT NULL,
+            rank INTEGER NOT NULL,
+            added_at INTEGER NOT NULL,
+            completed_at INTEGER,
+            updated_at INTEGER,
+            archived_at INTEGER NOT NULL
+        )
+        """
+    )
+    # Paginação por `(rank, id)` dentro da lista, como em `tasks`
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_archived_tasks_list_rank"
+        " ON archived_tasks (list_id, rank, id)"
+    )
+
+
+async def add_due_dates(conn):
+    """Prazos: `due_at` (época) e um índice parcial só com os lembretes
+    pendentes (com prazo, não concluídas e não excluídas), lido em intervalos
+    pelo `ReminderScheduler`"""
+    await conn.execute("ALTER TABLE tasks ADD COLUMN due_at INTEGER")
+    await conn.execute(
+        "CREATE INDEX idx_tasks_due ON tasks (due_at)"
+        " WHERE due_at IS NOT NULL AND completed = 0 AND deleted_at IS NULL"
+    )
+
+
+MIGRATIONS: List[Migration] = [
+    add_task_indexes,
+    add_search_index,
+    convert_timestamps_to_epoch,
+    add_settings_table,
+    add_task_lists,
+    add_task_ranks,
+    add_tombstones,
+    add_archive_table,
+    add_due_dates,
+]
+
+
+async def migrate(manager: ConnectionManager) -> int:
+    """Aplica, em uma única transação, as migrações ainda não aplicadas
+
+    Com o banco já atualizado o custo é uma leitura de `PRAGMA user_version`.
+    Retorna a versão final do esquema.
+    """
+    conn = await manager.writer()
+    async with conn.execute("PRAGMA user_version") as cursor:
+        (version,) = await cursor.fetchone()
+
+    if version >= len(MIGRATIONS):
+        return version
+
+    async with manager.transaction() as conn:
+        # Explícito: o `sqlite3` não abre transação sozinho antes de DDL
+        await conn.execute("BEGIN IMMEDIATE")
+        for migration in MIGRATIONS[version:]:
+            await migration(conn)
+        # PRAGMA não aceita parâmetros; o valor é sempre um inteiro nosso
+        await conn.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+
+    return len(MIGRATIONS)
@@ -0,0 +1,170 @@
+import asyncio
+import heapq
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from .db import Task, TaskKey, get_due_tasks, get_task
+from utils import now_epoch, traced
+
+logger = logging.getLogger("todo.reminders")
+
+# Maior id possível: a chave `(due_at, LAST_ID)` fica depois de todos os
+# lembretes com o mesmo prazo
+LAST_ID = (1 << 63) - 1
+
+
+class ReminderScheduler:
+    """Lembretes dos prazos, entregues por uma única corrotina.
+
+    Em vez de um temporizador por tarefa, mantém um heap mínimo de
+    `(due_at, id)` com os prazos da janela atual, lida por intervalo do índice
+    parcial `idx_tasks_due` (até `horizon` segundos à frente e no máximo
+    `limit` lembretes por leitura). A corrotina dorme até o primeiro prazo do
+    heap, ou até o fim da janela, quando lê a próxima.
+
+    Alterar um prazo custa O(log n): `set` empilha a nova entrada e `discard`
+    apenas esquece a tarefa; as entradas obsoletas são descartadas ao chegar
+    ao topo. Na hora do lembrete a tarefa é relida do banco, então as
+    concluídas ou excluídas (inclusive em massa) não são lembradas.
+    """
+
+    def __init__(self, horizon: int = 86400, limit: int = 10000, retry: float = 60.0):
+        self.horizon = horizon
+        self.limit = limit
+        self.retry = retry
+        self._heap: List[TaskKey] = []
+        # Prazo vigente de cada tarefa agendada (as demais entradas do heap
+        # estão obsoletas)
+        self._due: Dict[int, int] = {}
+        # Última chave `(due_at, id)` já lida do banco
+        self._window: TaskKey = (0, 0)
+        # Tarefas alteradas durante uma leitura (a linha lida pode ser anterior)
+        self._touched: Optional[Set[int]] = None
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Chamado com a tarefa (relida do banco) quando o prazo chega
+        self.on_due: Optional[Callable[[Task], Awaitable[None]]] = None
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Inicia a corrotina no loop do app (só os prazos futuros são lembrados)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._window = (now_epoch(), LAST_ID)
+        self._task = loop.create_task(self.run())
+
+    def set(self, task_id: int, due_at: Optional[int]) -> bool:
+        """Agenda (ou reagenda) o lembrete de uma tarefa; `None` cancela
+
+        Retorna se haverá lembrete (`False` sem prazo ou com o prazo já passado).
+        """
+        if self._touched is not None:
+            self._touched.add(task_id)
+        if due_at is None or due_at <= now_epoch():
+            self._due.pop(task_id, None)
+            return False
+        if self._due.get(task_id) == due_at:
+            return True
+        if (due_at, task_id) > self._window:
+            # Além da janela: entra quando a janela chegar lá
+            self._due.pop(task_id, None)
+            return True
+
+        self._due[task_id] = due_at
+        if len(self._heap) > 2 * len(self._due) + 64:
+            # Muitas entradas obsoletas: reconstrói o heap em O(n)
+            self._heap = [(due, task) for task, due in self._due.items()]
+            heapq.heapify(self._heap)
+        else:
+            heapq.heappush(self._heap, (due_at, task_id))
+        if self._heap[0] == (due_at, task_id):
+            self._wake.set()  # Novo primeiro prazo: a corrotina recalcula a espera
+        return True
+
+    def discard(self, task_id: int):
+        """Cancela o lembrete (tarefa concluída ou excluída)"""
+        self.set(task_id, None)
+
+    def refresh(self):
+        """Relê a janela do banco (após alterações em massa, como desmarcar
+        todas); as tarefas já agendadas não são duplicadas"""
+        if self._task is None:
+            return
+        self._window = (now_epoch(), LAST_ID)
+        self._wake.set()
+
+    @traced
+    async def run(self):
+        while True:
+            self._wake.clear()
+            try:
+                now = now_epoch()
+                await self._deliver(now)
+                if self._window[0] <= now:
+                    await self._read_window(now)
+                    continue
+            except Exception:
+                logger.exception(
+                    "Falha nos lembretes; nova tentativa em %ss", self.retry
+                )
+                await asyncio.sleep(self.retry)
+                continue
+
+            wake_at = self._window[0]
+            if self._heap:
+                wake_at = min(wake_at, self._heap[0][0])
+            try:
+                await asyncio.wait_for(self._wake.wait(), wake_at - now)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self):
+        """Encerra a corrotina (os lembretes são relidos na próxima sessão)"""
+        task, self._task = self._task, None
+        if task is None or task.done():
+            return
+        if task.get_loop() is not asyncio.get_running_loop():
+            # Loop do app já encerrado (`close_db` fora dele): a corrotina não
+            # roda mais e não pode ser cancelada nem aguardada daqui
+            return
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def _deliver(self, now: int):
+        while self._heap and self._heap[0][0] <= now:
+            due_at, task_id = heapq.heappop(self._heap)
+            if self._due.get(task_id) != due_at:
+                continue  # Entrada obsoleta (prazo alterado ou cancelado)
+            del self._due[task_id]
+            task = await get_task(task_id)
+            if task is None or task.completed or task.due_at != due_at:
+                continue
+            if self.on_due is not None:
+                await self.on_due(task)
+
+    async def _read_window(self, now: int):
+        """Lê os prazos após a janela atual, até `now + horizon`"""
+        after, until = self._window, now + self.horizon
+        # Alterações durante a leitura já entram no heap pela janela nova
+        self._window, self._touched = (until, LAST_ID), set()
+        try:
+            rows = await get_due_tasks(after, until, self.limit)
+        except Exception:
+            self._window = after
+            raise
+        finally:
+            touched, self._touched = self._touched, None
+
+        if len(rows) == self.limit:
+            # Janela cheia: termina no último lido e continua na próxima leitura
+            self._window = rows[-1]
+        for due_at, task_id in rows:
+            if task_id not in touched and task_id not in self._due:
+                self._due[task_id] = due_at
+                self._heap.append((due_at, task_id))
+        heapq.heapify(self._heap)
+
+
+# Agenda compartilhada, iniciada pelo app e interrompida em `close_db`
+reminders = ReminderScheduler()
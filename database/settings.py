@@ -0,0 +1,128 @@
+import asyncio
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional, Set
+from .db import manager
+from utils import traced
+
+logger = logging.getLogger("todo.settings")
+
+
+class SettingsStore:
+    """Preferências do app (chave/valor) servidas da memória.
+
+    Os valores são carregados uma única vez na inicialização (`load`) e as
+    leituras nunca tocam o disco. As escritas atualizam a memória na hora e
+    são gravadas em lote, em uma transação, após `delay` segundos; várias
+    alterações da mesma chave dentro desse intervalo viram uma só.
+    Os valores são guardados como JSON, então aceitam qualquer tipo simples.
+    """
+
+    def __init__(self, delay: float = 0.5):
+        self.delay = delay
+        self._values: Dict[str, Any] = {}
+        self._pending: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timer: Optional[asyncio.Handle] = None
+        # Flushes iniciados pelo temporizador (referências mantidas até terminarem)
+        self._flushes: Set[asyncio.Task] = set()
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Define o loop em que os flushes agendados serão executados"""
+        self._loop = loop
+
+    @traced
+    async def load(self):
+        """Lê todas as preferências para a memória (uma consulta na inicialização)"""
+        conn = await manager.reader()
+        async with conn.execute("SELECT key, value FROM settings") as cursor:
+            rows = await cursor.fetchall()
+        with self._lock:
+            self._values = {row["key"]: json.loads(row["value"]) for row in rows}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._values.get(key, default)
+
+    def set(self, key: str, value: Any):
+        """Altera a preferência na memória e agenda a gravação"""
+        encoded = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._values[key] = value
+            self._pending[key] = encoded
+        self._schedule()
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    @traced
+    async def flush(self):
+        """Grava as preferências alteradas em uma única transação"""
+        await self._wait_flushes()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        if not pending:
+            return
+
+        try:
+            async with manager.transaction() as conn:
+                await conn.executemany(
+                    "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                    pending.items(),
+                )
+        except Exception:
+            with self._lock:
+                # Devolve o lote sem sobrescrever alterações mais novas
+                self._pending = {**pending, **self._pending}
+            raise
+
+    async def _wait_flushes(self):
+        """Aguarda os flushes do temporizador em andamento (no loop atual): um
+        lote que falhe volta à fila antes desta gravação"""
+        current = asyncio.current_task()
+        loop = asyncio.get_running_loop()
+        running = [
+            task
+            for task in self._flushes
+            if task is not current and task.get_loop() is loop
+        ]
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+    def _schedule(self):
+        loop = self._loop
+        if loop is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return  # Sem loop: as alterações aguardam o próximo `flush()`
+
+        loop.call_soon_threadsafe(self._arm_timer, loop)
+
+    def _arm_timer(self, loop: asyncio.AbstractEventLoop):
+        with self._lock:
+            if self._pending and self._timer is None:
+                self._timer = loop.call_later(self.delay, self._start_flush, loop)
+
+    def _start_flush(self, loop: asyncio.AbstractEventLoop):
+        task = loop.create_task(self.flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task):
+        self._flushes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            # O lote voltou para `_pending`: vai na próxima gravação ou em `close_db`
+            logger.error("Falha ao gravar as preferências", exc_info=task.exception())
+
+
+# Preferências compartilhadas, carregadas em `init_db` e gravadas em `close_db`
+settings = SettingsStore()
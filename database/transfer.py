@@ -0,0 +1,302 @@
+import csv
+import json
+import os
+import re
+from itertools import islice
+from typing import Callable, Iterator, List, Optional, Tuple
+from .db import DEFAULT_LIST_ID, RANK_GAP, count_archived, count_tasks, manager
+from .db import next_rank
+from utils import now_epoch, to_epoch, traced
+
+# (processadas, total ou `None` se desconhecido), chamada a cada lote
+Progress = Callable[[int, Optional[int]], None]
+
+# Colunas dos arquivos importados/exportados (`id` e `list_id` são ignorados
+# na importação: as tarefas vão para o fim da lista escolhida, na ordem do
+# arquivo)
+FIELDS = (
+    "id",
+    "list_id",
+    "name",
+    "completed",
+    "added_at",
+    "completed_at",
+    "updated_at",
+    "due_at",
+)
+
+CHUNK_SIZE = 5000
+
+# Bloco lido por vez dos arquivos `.json` (um array, decodificado elemento a
+# elemento)
+BLOCK_SIZE = 1 << 16
+
+WHITESPACE = re.compile(r"\s*")
+
+TRUE_VALUES = {"1", "true", "t", "yes", "y", "sim", "s", "x"}
+
+TaskRow = Tuple[int, str, bool, int, Optional[int], int, Optional[int]]
+
+# (linha do arquivo, motivo) de cada registro recusado na importação
+Rejected = List[Tuple[int, str]]
+
+
+class JsonLine(str):
+    """Linha JSONL ainda não decodificada (a decodificação fica em `to_rows`,
+    que recusa só a linha inválida)"""
+
+
+def file_format(path: str) -> str:
+    """`csv`, `json` (um array de objetos) ou `jsonl`, pela extensão do arquivo"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension == ".json":
+        return "json"
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise ValueError(
+        f"Formato não suportado: '{extension}' (use .csv, .json ou .jsonl)"
+    )
+
+
+def parse_completed(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_VALUES
+    return bool(value)
+
+
+def read_json_array(file, block_size: int = BLOCK_SIZE) -> Iterator[Tuple[int, object]]:
+    """Elementos de um array JSON, com a linha em que cada um começa, lidos em
+    blocos de `block_size` caracteres (sem carregar o arquivo inteiro)
+
+    Um elemento inválido impede localizar os seguintes, então erros de sintaxe
+    interrompem a leitura com `ValueError`.
+    """
+    decoder = json.JSONDecoder()
+    # `line` é a linha do início de `buffer`
+    buffer, position, line, eof = "", 0, 1, False
+    # Próximo token: "[", "first" (elemento ou "]"), "value" ou ","
+    expected = "["
+    more = True
+
+    while True:
+        if more:
+            # Descarta o já lido e acrescenta o próximo bloco
+            line += buffer.count("\n", 0, position)
+            block = file.read(block_size)
+            buffer, position, eof, more = buffer[position:] + block, 0, not block, False
+
+        position = WHITESPACE.match(buffer, position).end()
+        if position == len(buffer):
+            if eof:
+                raise ValueError(
+                    "JSON inválido: o arquivo termina antes do fim do array"
+                )
+            more = True
+            continue
+
+        char = buffer[position]
+        at = line + buffer.count("\n", 0, position)
+        if expected == "[":
+            if char != "[":
+                raise ValueError(f"JSON inválido na linha {at}: esperado um array")
+            position, expected = position + 1, "first"
+        elif expected == "," or (expected == "first" and char == "]"):
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"JSON inválido na linha {at}: esperado ',' ou ']'")
+            position, expected = position + 1, "value"
+        else:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as error:
+                if not eof:
+                    more = True  # Elemento incompleto no bloco
+                    continue
+                at = line + buffer.count("\n", 0, error.pos)
+                raise ValueError(f"JSON inválido na linha {at}: {error.msg}") from error
+            if end == len(buffer) and not eof:
+                more = True  # Um número no fim do bloco pode continuar no próximo
+                continue
+            yield at, value
+            position, expected = end, ","
+
+
+def read_records(path: str) -> Iterator[Tuple[int, object]]:
+    """Lê o arquivo registro a registro, sem carregá-lo inteiro, com o número
+    da linha de cada um (as linhas JSONL, como `JsonLine`, são decodificadas
+    em `to_rows`)
+
+    O BOM inicial, gravado por exemplo no "CSV UTF-8" do Excel, é descartado
+    (senão a primeira coluna viraria `"\\ufeffname"`).
+    """
+    input_format = file_format(path)
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        if input_format == "csv":
+            reader = csv.DictReader(file)
+            for record in reader:
+                yield reader.line_num, record
+        elif input_format == "json":
+            yield from read_json_array(file)
+        else:
+            for line, text in enumerate(file, 1):
+                if text.strip():
+                    yield line, JsonLine(text)
+
+
+def to_row(record: dict, now: int, list_id: int) -> TaskRow:
+    """Normaliza um registro; datas (época, texto ISO ou pt_BR) ausentes
+    recebem `now` (o prazo ausente fica sem prazo)"""
+    if not isinstance(record, dict):
+        raise ValueError("o registro não é um objeto")
+    name = str(record.get("name") or "").strip()
+    if not name:
+        raise ValueError("tarefa sem nome")
+    completed = parse_completed(record.get("completed", False))
+    completed_at = to_epoch(record.get("completed_at"))
+    if completed and completed_at is None:
+        completed_at = now
+    return (
+        list_id,
+        name,
+        completed,
+        to_epoch(record.get("added_at")) or now,
+        completed_at,
+        to_epoch(record.get("updated_at")) or now,
+        to_epoch(record.get("due_at")),
+    )
+
+
+def to_rows(
+    records: Iterator[Tuple[int, object]],
+    now: int,
+    list_id: int,
+    rejected: Optional[Rejected] = None,
+) -> Iterator[TaskRow]:
+    """Valida e normaliza os registros um a um; os inválidos são pulados e
+    anotados em `rejected` com a linha e o motivo"""
+    for line, record in records:
+        try:
+            if isinstance(record, JsonLine):
+                try:
+                    record = json.loads(record)
+                except json.JSONDecodeError as error:
+                    raise ValueError(f"JSON inválido ({error.msg})") from error
+            row = to_row(record, now, list_id)
+        except (ValueError, TypeError) as error:
+            if rejected is not None:
+                rejected.append((line, str(error)))
+            continue
+        yield row
+
+
+@traced
+async def import_tasks(
+    path: str,
+    chunk_size: int = CHUNK_SIZE,
+    progress: Optional[Progress] = None,
+    list_id: int = DEFAULT_LIST_ID,
+    rejected: Optional[Rejected] = None,
+) -> int:
+    """Importa tarefas de um CSV/JSON/JSONL para a lista `list_id`, em lotes
+    de `chunk_size` linhas
+
+    Cada lote é gravado com `executemany` em uma transação própria, então a
+    memória usada não depende do tamanho do arquivo. Registros inválidos (sem
+    nome, data ou JSON inválidos) não interrompem a importação: vão para
+    `rejected` com o número da linha. Retorna o total importado.
+    """
+    conn = await manager.writer()
+    first_rank = await next_rank(conn, list_id)
+    rows = (
+        (*row, first_rank + position * RANK_GAP)
+        for position, row in enumerate(
+            to_rows(read_records(path), now_epoch(), list_id, rejected)
+        )
+    )
+    imported = 0
+    while chunk := list(islice(rows, chunk_size)):
+        async with manager.transaction() as conn:
+            await conn.executemany(
+                "INSERT INTO tasks"
+                " (list_id, name, completed, added_at, completed_at, updated_at,"
+                " due_at, rank) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                chunk,
+            )
+        imported += len(chunk)
+        if progress is not None:
+            progress(imported, None)
+    return imported
+
+
+@traced
+async def export_tasks(
+    path: str,
+    batch_size: int = CHUNK_SIZE,
+    progress: Optional[Progress] = None,
+    list_id: Optional[int] = None,
+) -> int:
+    """Exporta as tarefas, inclusive as arquivadas (todas, ou só as da lista
+    `list_id`), para CSV/JSON/JSONL na ordem de cada lista (reimportar mantém
+    a ordem manual)
+
+    As linhas são lidas do cursor em lotes de `batch_size` (sem `fetchall`).
+    No app, grave antes a `write_queue` para incluir alterações pendentes.
+    Retorna o total exportado.
+    """
+    output_format = file_format(path)
+    total, _ = await count_tasks(list_id)
+    total += await count_archived(list_id)
+    # Tarefas vivas e arquivadas (as excluídas que aguardam a limpeza ficam de
+    # fora); `rank` vem por último, só para a ordenação. As arquivadas não
+    # guardam prazo
+    archived = (
+        "id, list_id, name, 1 AS completed, added_at, completed_at, updated_at,"
+        " NULL AS due_at, rank"
+    )
+    query = f"SELECT {', '.join(FIELDS)}, rank FROM tasks WHERE deleted_at IS NULL"
+    archived_query = f"SELECT {archived} FROM archived_tasks"
+    params: list = []
+    if list_id is not None:
+        query += " AND list_id = ?"
+        archived_query += " WHERE list_id = ?"
+        params += [list_id, list_id]
+    query += f" UNION ALL {archived_query} ORDER BY list_id, rank, id"
+    conn = await manager.reader()
+    exported = 0
+
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file) if output_format == "csv" else None
+        if writer is not None:
+            writer.writerow(FIELDS)
+        # Em `.json`, os objetos vão separados por vírgula dentro de um array
+        separator = ",\n" if output_format == "json" else "\n"
+        if output_format == "json":
+            file.write("[\n")
+
+        async with conn.execute(query, params) as cursor:
+            while rows := await cursor.fetchmany(batch_size):
+                rows = [tuple(row)[: len(FIELDS)] for row in rows]
+                if writer is not None:
+                    writer.writerows((*row[:3], int(row[3]), *row[4:]) for row in rows)
+                else:
+                    file.writelines(
+                        (separator if exported or position else "")
+                        + json.dumps(
+                            {**dict(zip(FIELDS, row)), "completed": bool(row[3])},
+                            ensure_ascii=False,
+                        )
+                        for position, row in enumerate(rows)
+                    )
+                exported += len(rows)
+                if progress is not None:
+                    progress(exported, total)
+
+        if output_format == "json":
+            file.write("\n]\n")
+        elif writer is None and exported:
+            file.write("\n")
+
+    return exported
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Set
+from .db import apply_task_changes
+from utils import traced
+
+logger = logging.getLogger("todo.write_behind")
+
+
+@dataclass
+class PendingStatus:
+    original: bool
+    completed: bool
+    updated_at: int
+
+
+@dataclass
+class PendingName:
+    original: str
+    name: str
+    updated_at: int
+
+
+# Recebe `(status, nomes)` de um lote que não pôde ser gravado
+ErrorHandler = Callable[[Dict[int, PendingStatus], Dict[int, PendingName]], None]
+
+
+class WriteBehindQueue:
+    """Fila de escrita adiada para as alterações de tarefas.
+
+    As alterações são aceitas imediatamente e agrupadas por `task_id`:
+    várias alterações na mesma tarefa viram uma só, e marcar/desmarcar a
+    mesma tarefa se anulam. A fila é gravada em uma única transação após
+    `delay` segundos ou quando atinge `max_pending` tarefas pendentes.
+    Se a gravação falhar, o lote é desfeito no banco e entregue a `on_error`,
+    que reverte o que já foi exibido (os valores originais vão junto); sem
+    `on_error`, o lote volta à fila para o próximo `flush()`.
+    """
+
+    def __init__(self, delay: float = 0.3, max_pending: int = 200):
+        self.delay = delay
+        self.max_pending = max_pending
+        self._statuses: Dict[int, PendingStatus] = {}
+        self._names: Dict[int, PendingName] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timer: Optional[asyncio.Handle] = None
+        # Flushes iniciados pelo temporizador (referências mantidas até terminarem)
+        self._flushes: Set[asyncio.Task] = set()
+        self.on_error: Optional[ErrorHandler] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Define o loop em que os flushes agendados serão executados"""
+        self._loop = loop
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._statuses.keys() | self._names.keys())
+
+    def set_status(self, task_id: int, completed: bool, updated_at: int):
+        """Enfileira a troca de status (cada chamada inverte o status anterior)"""
+        with self._lock:
+            pending = self._statuses.get(task_id)
+            if pending is None:
+                self._statuses[task_id] = PendingStatus(
+                    original=not completed, completed=completed, updated_at=updated_at
+                )
+            elif pending.original == completed:
+                # Voltou ao estado gravado no banco: nada a fazer
+                del self._statuses[task_id]
+            else:
+                pending.completed = completed
+                pending.updated_at = updated_at
+        self._schedule()
+
+    def rename(self, task_id: int, name: str, updated_at: int, original: str):
+        """Enfileira a troca de nome (prevalece o último nome)"""
+        with self._lock:
+            pending = self._names.get(task_id)
+            if pending is None:
+                self._names[task_id] = PendingName(
+                    original=original, name=name, updated_at=updated_at
+                )
+            elif pending.original == name:
+                # Voltou ao nome gravado no banco: nada a fazer
+                del self._names[task_id]
+            else:
+                pending.name = name
+                pending.updated_at = updated_at
+        self._schedule()
+
+    def discard(self, task_id: int):
+        """Descarta as alterações pendentes de uma tarefa removida"""
+        with self._lock:
+            self._statuses.pop(task_id, None)
+            self._names.pop(task_id, None)
+
+    @traced
+    async def flush(self):
+        """Grava todas as alterações pendentes em uma única transação"""
+        await self._wait_flushes()
+        with self._lock:
+            statuses, self._statuses = self._statuses, {}
+            names, self._names = self._names, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        if not statuses and not names:
+            return
+
+        try:
+            await apply_task_changes(
+                statuses=[
+                    (change.completed, change.updated_at, task_id)
+                    for task_id, change in statuses.items()
+                ],
+                names=[
+                    (change.name, change.updated_at, task_id)
+                    for task_id, change in names.items()
+                ],
+            )
+        except Exception:
+            if self.on_error is not None:
+                self.on_error(statuses, names)
+            else:
+                with self._lock:
+                    # Devolve o lote sem sobrescrever alterações mais novas
+                    self._statuses = {**statuses, **self._statuses}
+                    self._names = {**names, **self._names}
+            raise
+
+    async def _wait_flushes(self):
+        """Aguarda os flushes do temporizador em andamento (no loop atual): um
+        lote que falhe volta à fila antes desta gravação"""
+        current = asyncio.current_task()
+        loop = asyncio.get_running_loop()
+        running = [
+            task
+            for task in self._flushes
+            if task is not current and task.get_loop() is loop
+        ]
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+    def _schedule(self):
+        loop = self._loop
+        if loop is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return  # Sem loop: as alterações aguardam o próximo `flush()`
+
+        loop.call_soon_threadsafe(self._arm_timer, loop)
+
+    def _arm_timer(self, loop: asyncio.AbstractEventLoop):
+        with self._lock:
+            size = len(self._statuses.keys() | self._names.keys())
+            if size == 0:
+                return
+            if size >= self.max_pending:
+                if self._timer is not None:
+                    self._timer.cancel()
+                self._timer = loop.call_soon(self._start_flush, loop)
+            elif self._timer is None:
+                self._timer = loop.call_later(self.delay, self._start_flush, loop)
+
+    def _start_flush(self, loop: asyncio.AbstractEventLoop):
+        task = loop.create_task(self.flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task):
+        self._flushes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            # O lote já foi revertido (`on_error`) ou devolvido à fila
+            logger.error(
+                "Falha ao gravar a fila de alterações", exc_info=task.exception()
+            )
+
+
+# Fila compartilhada, gravada também no encerramento do app (`close_db`)
+write_queue = WriteBehindQueue()
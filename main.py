@@ -1,11 +1,22 @@
 import flet as ft
 import asyncio
-from database import init_db, get_current_theme
+from database import init_db, close_db, settings
 from classes import TodoApp
+from utils import startup_timer
 
 
-def setup_page(page: ft.Page):
-    theme: str = get_current_theme(1)
+async def window_event(event: ft.WindowEvent):
+    if event.type == ft.WindowEventType.CLOSE:
+        # Encerra no loop do app, onde vivem as tarefas em segundo plano
+        # (limpeza, lembretes e gravações agendadas); a janela fecha mesmo
+        # se o encerramento falhar
+        try:
+            await close_db()
+        finally:
+            event.page.window.destroy()
+
+
+def setup_page(page: ft.Page, theme: str):
     full_hd_res_width: int = 1920
     full_hd_res_height: int = 1080
 
@@ -17,13 +28,18 @@ def setup_page(page: ft.Page):
     # position numbers
     page.window.left = (full_hd_res_width - page.window.width) / 2
     page.window.top = (full_hd_res_height - page.window.height) / 2
+    # O fechamento passa por `window_event`
+    page.window.prevent_close = True
+    page.window.on_event = window_event
     page.update()
 
 
-def main(page: ft.Page):
-    setup_page(page)
-
+async def main(page: ft.Page):
+    startup_timer.mark("session_started")
     app = TodoApp(page)
+    # Preferências já estão em memória (carregadas em `init_db`)
+    setup_page(page, settings.get("theme", "dark"))
+    startup_timer.mark("theme_loaded")
 
     page.add(
         ft.Row(
@@ -38,9 +54,16 @@ def main(page: ft.Page):
             alignment=ft.MainAxisAlignment.CENTER,
         )
     )
+    startup_timer.mark("shell_built")
 
 
 if __name__ == "__main__":
     # Inicializa o banco de dados antes de iniciar a interface
     asyncio.run(init_db())
-    ft.app(target=main)
+    startup_timer.mark("db_ready")
+    try:
+        ft.app(target=main)
+    finally:
+        # Garantia para encerramentos que não passam pela janela (ex.: Ctrl+C);
+        # sem nada pendente, não faz nada
+        asyncio.run(close_db())
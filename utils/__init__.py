@@ -1,9 +1,24 @@
 from .date_utils import get_current_datetime
 from .date_utils import datetime_iso4ptbr
+from .date_utils import now_epoch, epoch4ptbr, to_epoch
+from .startup_timer import StartupTimer, startup_timer
+from .tracing import span, trace_attribute, traced, tracer
 
 # Exporta as funções para serem acessíveis via `utils.função`
 
-__all__ = ["get_current_datetime", "datetime_iso4ptbr"]
+__all__ = [
+    "get_current_datetime",
+    "datetime_iso4ptbr",
+    "now_epoch",
+    "epoch4ptbr",
+    "to_epoch",
+    "StartupTimer",
+    "startup_timer",
+    "span",
+    "trace_attribute",
+    "traced",
+    "tracer",
+]
 
 """
 Em Python, `__all__` é uma variável especial usada
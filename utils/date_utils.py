@@ -1,4 +1,10 @@
+import time
 from datetime import datetime
+from functools import lru_cache
+from typing import Optional, Union
+
+PTBR_FORMAT = "%d/%m/%Y %H:%M:%S"
+PTBR_DATE_FORMAT = "%d/%m/%Y"
 
 
 def get_current_datetime() -> str:
@@ -9,7 +15,41 @@ def get_current_datetime() -> str:
 
 def datetime_iso4ptbr(date: str) -> str:
     """Converte a data e hora atual em formato ISO para o padrao pt_BR `%d/%m/%Y %H:%M:%S`"""
-    data_em_ptbr = datetime.strptime(date, "%Y-%m-%d %H:%M:%S").strftime(
-        "%d/%m/%Y %H:%M:%S"
-    )
+    data_em_ptbr = datetime.strptime(date, "%Y-%m-%d %H:%M:%S").strftime(PTBR_FORMAT)
     return data_em_ptbr
+
+
+def now_epoch() -> int:
+    """Retorna o instante atual em segundos desde a época (uma leitura do relógio)
+
+    Leia uma vez por operação e reutilize o valor em todas as colunas.
+    """
+    return int(time.time())
+
+
+@lru_cache(maxsize=4096)
+def epoch4ptbr(epoch: int) -> str:
+    """Formata um instante (segundos desde a época) no padrão pt_BR, com cache"""
+    return time.strftime(PTBR_FORMAT, time.localtime(epoch))
+
+
+def to_epoch(value: Union[int, float, str, None]) -> Optional[int]:
+    """Converte um instante em inteiro, texto ISO ou pt_BR (`PTBR_FORMAT`, ou
+    só a data) no horário local para época; `ValueError` se não reconhecido"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    value = value.strip()
+    if value.lstrip("-").isdigit():
+        return int(value)
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except ValueError:
+        pass
+    for date_format in (PTBR_FORMAT, PTBR_DATE_FORMAT):
+        try:
+            return int(datetime.strptime(value, date_format).timestamp())
+        except ValueError:
+            pass
+    raise ValueError(f"data inválida: '{value}'")
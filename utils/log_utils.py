@@ -0,0 +1,19 @@
+import logging
+import sys
+
+
+def console_logger(name: str) -> logging.Logger:
+    """Logger que escreve em `stderr` no nível INFO
+
+    Nem o app nem o flet configuram o `logging`: sem um handler próprio, os
+    registros INFO seriam descartados.
+    """
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(name)s: %(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    # Sem repetir no logger raiz, caso ele venha a ser configurado
+    logger.propagate = False
+    return logger
@@ -0,0 +1,29 @@
+import time
+from typing import Dict
+from .log_utils import console_logger
+
+# Uma linha por abertura, em `stderr`
+logger = console_logger("todo.startup")
+
+
+class StartupTimer:
+    """Registra o tempo (ms desde o início do processo) de cada fase da abertura"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def mark(self, phase: str) -> float:
+        """Registra a fase (apenas a primeira ocorrência) e retorna o tempo em ms"""
+        elapsed = (time.perf_counter() - self.started_at) * 1000
+        self.phases.setdefault(phase, elapsed)
+        return self.phases[phase]
+
+    def report(self):
+        """Envia as fases registradas ao log `todo.startup` (em `stderr`)"""
+        summary = ", ".join(f"{phase}={ms:.1f}ms" for phase, ms in self.phases.items())
+        logger.info("startup: %s", summary)
+
+
+# Instância única, criada na importação (o mais cedo possível)
+startup_timer = StartupTimer()
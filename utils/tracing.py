@@ -0,0 +1,192 @@
+"""Medição opcional de latência, ativada pela variável de ambiente `TODO_TRACE`
+
+- `TODO_TRACE=log`: registra p50/p95/p99 de cada span no log `todo.trace`
+  (em `stderr`)
+- `TODO_TRACE=<arquivo>.json`: grava o resumo em JSON ao encerrar o app
+
+Desativado (padrão), `traced` devolve a própria função e `span` um contexto
+vazio: o custo fica restrito à importação.
+"""
+
+import atexit
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from inspect import isasyncgenfunction, iscoroutinefunction
+from typing import Dict
+from .log_utils import console_logger
+
+logger = logging.getLogger("todo.trace")
+
+TRACE_ENV = "TODO_TRACE"
+
+# Sub-faixas por potência de 2: erro relativo máximo de ~6% nos percentis
+SUB_BUCKETS = 8
+
+
+class Histogram:
+    """Histograma logarítmico de durações (µs) com memória constante"""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, micros: float):
+        mantissa, exponent = math.frexp(max(micros, 1.0))
+        bucket = exponent * SUB_BUCKETS + int((mantissa - 0.5) * 2 * SUB_BUCKETS)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += micros
+        self.max = max(self.max, micros)
+
+    def percentile(self, fraction: float) -> float:
+        """Ponto médio da faixa que contém o percentil (em µs)"""
+        rank = fraction * self.count
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                exponent, sub = divmod(bucket, SUB_BUCKETS)
+                low = math.ldexp(0.5 + sub / (2 * SUB_BUCKETS), exponent)
+                high = math.ldexp(0.5 + (sub + 1) / (2 * SUB_BUCKETS), exponent)
+                return min((low + high) / 2, self.max)
+        return self.max
+
+
+class Tracer:
+    """Histogramas por span, com resumo emitido no encerramento"""
+
+    def __init__(self, target: str = ""):
+        self.target = target
+        self.enabled = bool(target)
+        self.histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.record(seconds * 1_000_000)
+
+    def summary(self) -> Dict[str, dict]:
+        """p50/p95/p99 (ms) de cada span, do mais lento (total) ao mais rápido"""
+        with self._lock:
+            items = sorted(
+                self.histograms.items(), key=lambda item: item[1].total, reverse=True
+            )
+            return {
+                name: {
+                    "count": histogram.count,
+                    "total_ms": round(histogram.total / 1000, 3),
+                    "p50_ms": round(histogram.percentile(0.50) / 1000, 3),
+                    "p95_ms": round(histogram.percentile(0.95) / 1000, 3),
+                    "p99_ms": round(histogram.percentile(0.99) / 1000, 3),
+                    "max_ms": round(histogram.max / 1000, 3),
+                }
+                for name, histogram in items
+            }
+
+    def dump(self):
+        """Grava o resumo no arquivo JSON configurado ou no log"""
+        summary = self.summary()
+        if not summary:
+            return
+        if self.target.lower().endswith(".json"):
+            with open(self.target, "w", encoding="utf-8") as file:
+                json.dump({"spans": summary}, file, indent=2)
+        else:
+            for name, stats in summary.items():
+                logger.info("%s %s", name, stats)
+
+
+tracer = Tracer(os.environ.get(TRACE_ENV, ""))
+if tracer.enabled:
+    console_logger(logger.name)
+    atexit.register(tracer.dump)
+
+
+def traced(func):
+    """Mede cada chamada da função (síncrona ou assíncrona) como um span"""
+    if not tracer.enabled:
+        return func
+    return _wrap(func, f"{func.__module__}.{func.__qualname__}")
+
+
+def trace_attribute(obj, attribute: str, name: str):
+    """Substitui o método `attribute` de uma instância por uma versão medida"""
+    if tracer.enabled:
+        setattr(obj, attribute, _wrap(getattr(obj, attribute), name))
+
+
+def _wrap(func, name: str):
+    if isasyncgenfunction(func):
+
+        # Geradores: cada item (lote) é um span, sem contar o tempo do consumidor
+        @wraps(func)
+        async def generator_wrapper(*args, **kwargs):
+            generator = func(*args, **kwargs)
+            try:
+                while True:
+                    started = time.perf_counter()
+                    try:
+                        item = await generator.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    finally:
+                        tracer.record(name, time.perf_counter() - started)
+                    yield item
+            finally:
+                await generator.aclose()
+
+        return generator_wrapper
+
+    if iscoroutinefunction(func):
+
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                tracer.record(name, time.perf_counter() - started)
+
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            tracer.record(name, time.perf_counter() - started)
+
+    return wrapper
+
+
+_disabled_span = nullcontext()
+
+
+def span(name: str):
+    """Mede um trecho de código: `with span("sqlite.connect"): ...`"""
+    if not tracer.enabled:
+        return _disabled_span
+    return _span(name)
+
+
+@contextmanager
+def _span(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        tracer.record(name, time.perf_counter() - started)